@@ -0,0 +1,194 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import time
+
+import numpy
+
+import prisoners_dilemma as pd
+import registry
+from vectorized import play_multiple_rounds_vectorized
+
+## how fast the game loop is, and how much memory it takes, over a sweep of population sizes, rounds per
+## generation, strategy mixes and engines. every case runs in a fresh process so its peak memory is its
+## own. results go to a json file, and can be checked against an earlier one:
+##   python benchmark.py --save baseline.json
+##   python benchmark.py --compare baseline.json
+
+mixes = {'all': lambda: list(pd.strat_list),
+         'deterministic': lambda: [s for s in pd.strat_list if s in registry.deterministic()],
+         'stochastic': lambda: [s for s in pd.strat_list if registry.lookup(s).stochastic]}
+
+engines = {'loop': pd.play_multiple_rounds,
+           'vectorized': play_multiple_rounds_vectorized}
+
+QUICK = {'players': [20,100],'years': [10],'mixes': ['all','deterministic','stochastic'],'engines': ['loop','vectorized']}
+FULL = {'players': [20,100,500,2000],'years': [1,10,100],'mixes': ['all','deterministic','stochastic'],'engines': ['loop','vectorized']}
+
+## the play() loop does about 10**5 matches a second, so bigger cases than this take it minutes to hours
+## each and are left out for it
+LOOP_MAX_MATCHES = 2 * 10 ** 6
+## above this many matches a round is only timed once rather than best of 3
+REPEAT_MAX_MATCHES = 10 ** 5
+
+
+def _rss_kb():
+    '''memory the process is using right now, in kB'''
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize() // 1024
+    except IOError:
+        ## not linux: the peak is the best we can do
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def _setup(players,mix,seed):
+    random.seed(seed)
+    numpy.random.seed(seed)
+    strats = mixes[mix]()
+    pd.strat_list = strats
+    pd.new_population(strats[0],players)
+    for i, player in enumerate(pd.playerlist):
+        player.strat = strats[i % len(strats)]
+
+def _budget(players,years,gens):
+    '''fewer generations for big cases, so every case takes about as long'''
+    return max(2,min(gens,int(gens * 20 * 20 * 10 / float(players * players * years))))
+
+def run_case(case):
+    '''one benchmark case, run in its own process'''
+    players, years, mix, engine, gens, seed = case
+    playrounds = engines[engine]
+    _setup(players,mix,seed)
+    matches = players * (players - 1) // 2 * years
+    ## best of a few, the machine is never quite idle, unless one is slow enough already
+    rounds_time = float('inf')
+    for t in range(3 if matches <= REPEAT_MAX_MATCHES else 1):
+        start = time.time()
+        playrounds(years)
+        rounds_time = min(rounds_time,time.time() - start)
+    gens = _budget(players,years,gens)
+    _setup(players,mix,seed)
+    ## memory growth is measured over the second half of the run, after the first generations have
+    ## allocated whatever they are going to keep. one evolve2 call, since each call ends by removing
+    ## players, and the sample is taken from its record hook
+    half = gens // 2
+    rss = []
+    def sample(record):
+        if record['gen'] == half:
+            rss.append(_rss_kb())
+    start = time.time()
+    pd.evolve2(gens,years,toPrint = False,playrounds = playrounds,record = sample,every = half)
+    evolve_time = time.time() - start
+    ## evolve2 plays one more generation at the end, without selection
+    played = gens + 1
+    return {'name': '%s/%s/players=%d/years=%d' % (engine,mix,players,years),
+            'engine': engine,'mix': mix,'players': players,'years': years,'generations': gens,
+            'matches_per_sec': matches / rounds_time,
+            'generations_per_sec': played / evolve_time,
+            'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            'rss_growth_kb_per_gen': (_rss_kb() - rss[0]) / float(played - half)}
+
+def run_play(numgames = 100000,seed = 0):
+    '''play() on its own, between two players'''
+    _setup(2,'all',seed)
+    player1, player2 = pd.playerlist
+    start = time.time()
+    for t in range(numgames):
+        pd.play(player1,player2)
+    return {'name': 'play','matches_per_sec': numgames / (time.time() - start),
+            'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+def _isolated(func,*args):
+    pool = multiprocessing.Pool(1)
+    try:
+        return pool.apply(func,args)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def sweep(players,years,mixes,engines,gens = 50,seed = 0,toPrint = True):
+    '''every combination of the lists given. returns the results as a dict ready for json'''
+    results = [_isolated(run_play)]
+    for num in players:
+        for numyears in years:
+            for mix in mixes:
+                for engine in engines:
+                    if engine == 'loop' and num * (num - 1) // 2 * numyears > LOOP_MAX_MATCHES:
+                        if toPrint:
+                            print '%-45s skipped, too slow for the loop' % ('%s/%s/players=%d/years=%d' % (engine,mix,num,numyears))
+                        continue
+                    results.append(_isolated(run_case,(num,numyears,mix,engine,gens,seed)))
+                    if toPrint:
+                        print _line(results[-1])
+    return {'python': platform.python_version(),'machine': platform.machine(),
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),'cases': results}
+
+def _line(result):
+    rates = '%12.0f matches/s' % result['matches_per_sec']
+    if 'generations_per_sec' in result:
+        rates += '%10.2f gens/s %10d kB peak %8.1f kB/gen' % (result['generations_per_sec'],result['peak_rss_kb'],result['rss_growth_kb_per_gen'])
+    return '%-45s %s' % (result['name'],rates)
+
+
+def compare(results,baseline,tolerance = 0.1):
+    '''(name, measure, baseline value, new value) for every rate that fell more than tolerance (a
+    fraction) below baseline, or memory that went up by more than that'''
+    old = dict((case['name'],case) for case in baseline['cases'])
+    worse = []
+    for case in results['cases']:
+        if case['name'] not in old:
+            continue
+        for measure in ('matches_per_sec','generations_per_sec'):
+            if measure in case and case[measure] < old[case['name']][measure] * (1 - tolerance):
+                worse.append((case['name'],measure,old[case['name']][measure],case[measure]))
+        if case['peak_rss_kb'] > old[case['name']]['peak_rss_kb'] * (1 + tolerance):
+            worse.append((case['name'],'peak_rss_kb',old[case['name']]['peak_rss_kb'],case['peak_rss_kb']))
+    return worse
+
+def speedups(results,baseline):
+    '''name -> new matches/sec over baseline matches/sec, for the cases in both'''
+    old = dict((case['name'],case) for case in baseline['cases'])
+    return dict((case['name'],case['matches_per_sec'] / old[case['name']]['matches_per_sec'])
+                for case in results['cases'] if case['name'] in old)
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'benchmark the game loop')
+    parser.add_argument('--full',action = 'store_true',help = 'the full sweep, up to 2000 players')
+    parser.add_argument('--players',type = int,nargs = '+')
+    parser.add_argument('--years',type = int,nargs = '+')
+    parser.add_argument('--mixes',nargs = '+',choices = sorted(mixes))
+    parser.add_argument('--engines',nargs = '+',choices = sorted(engines))
+    parser.add_argument('--generations',type = int,default = 50,help = 'generations for the smallest cases')
+    parser.add_argument('--save',default = 'benchmark.json',help = 'where to write the results')
+    parser.add_argument('--compare',help = 'earlier results to check against')
+    parser.add_argument('--tolerance',type = float,default = 0.1)
+    args = parser.parse_args(argv)
+    plan = dict(FULL if args.full else QUICK)
+    for key in plan:
+        if getattr(args,key):
+            plan[key] = getattr(args,key)
+    ## read before anything is saved, --save and --compare can be the same file
+    baseline = None
+    if args.compare and os.path.exists(args.compare):
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    results = sweep(plan['players'],plan['years'],plan['mixes'],plan['engines'],args.generations)
+    with open(args.save,'w') as f:
+        json.dump(results,f,indent = 1,sort_keys = True)
+    if baseline is not None:
+        for name, ratio in sorted(speedups(results,baseline).items()):
+            print '%-45s %6.2fx' % (name,ratio)
+        worse = compare(results,baseline,args.tolerance)
+        for name, measure, before, after in worse:
+            print 'REGRESSION %s %s: %.1f -> %.1f' % (name,measure,before,after)
+        return 1 if worse else 0
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
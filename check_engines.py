@@ -0,0 +1,76 @@
+import argparse
+
+import numpy
+
+import prisoners_dilemma as pd
+import registry
+from keyed import KeyedRounds
+from matchings import ParallelRounds
+from vectorized import play_multiple_rounds_vectorized
+
+## the engines only get to differ in the random numbers they draw, so strategies that never draw any have
+## to score exactly what the play() loop gives them, however the games are batched, ordered or split over
+## processes. this plays the same few rounds with each engine, with a player replaced between calls so the
+## history carried over and the births are checked too, and compares the points:
+##   python check_engines.py
+##   python check_engines.py --players 30 --years 10 --workers 4
+
+
+def _points(playrounds,strats,numplayers,numrounds,calls):
+    '''each player's points after each of calls calls of playrounds(numrounds), starting from numplayers
+    new players taking strats in turn'''
+    pd.new_population(strats[0],numplayers)
+    for i, player in enumerate(pd.playerlist):
+        player.strat = strats[i % len(strats)]
+    points = []
+    for t in range(calls):
+        playrounds(numrounds)
+        points.append([player.points for player in pd.playerlist])
+        ## somebody dies and somebody is born in their slot, like a generation of evolve2
+        pd.freeslots.append(pd.playerlist.pop(t % numplayers).index)
+        pd.Player(t,strats[t % len(strats)])
+    return numpy.array(points)
+
+def check(strats = None,numplayers = 13,numrounds = 5,calls = 3,workers = 3):
+    '''engine -> whether it gave the same points as the play() loop. strats = deterministic ones, all of
+    strat_list's by default'''
+    if strats is None:
+        strats = [strat for strat in pd.strat_list if strat in registry.deterministic()]
+    if set(strats) - registry.deterministic():
+        raise ValueError('only deterministic strategies score the same in every engine')
+    args = (strats,numplayers,numrounds,calls)
+    expected = _points(pd.play_multiple_rounds,*args)
+    results = {'vectorized': _points(play_multiple_rounds_vectorized,*args),
+               'keyed serial': _points(KeyedRounds(batched = False).play_rounds,*args),
+               'keyed batched': _points(KeyedRounds().play_rounds,*args)}
+    for num in sorted(set([1,workers])):
+        rounds = ParallelRounds(strats,numplayers,num)
+        try:
+            results['parallel, %d workers' % num] = _points(rounds.play_players,*args)
+        finally:
+            rounds.close()
+    return dict((name,numpy.array_equal(points,expected)) for name, points in results.items())
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'check every engine plays deterministic strategies like the play() loop')
+    parser.add_argument('--strategies',nargs = '+',help = 'names, all the deterministic ones in strat_list by default')
+    parser.add_argument('--players',type = int,default = 13)
+    parser.add_argument('--years',type = int,default = 5,help = 'rounds per call')
+    parser.add_argument('--calls',type = int,default = 3)
+    parser.add_argument('--workers',type = int,default = 3,help = 'processes for the parallel engine, besides 1')
+    args = parser.parse_args(argv)
+    try:
+        strats = registry.by_name(args.strategies) if args.strategies else None
+    except KeyError as e:
+        parser.error(e.args[0])
+    try:
+        results = check(strats,args.players,args.years,args.calls,args.workers)
+    except ValueError as e:
+        parser.error(e.args[0])
+    for name, same in sorted(results.items()):
+        print '%-22s %s' % (name,'ok' if same else 'DIFFERENT')
+    return 0 if all(results.values()) else 1
+
+if __name__ == '__main__':
+    raise SystemExit(main())
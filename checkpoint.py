@@ -0,0 +1,113 @@
+import cPickle
+import os
+import random
+import tempfile
+import time
+
+import numpy
+
+import prisoners_dilemma as pd
+from registry import by_name
+
+## stopping a long evolve2 run and carrying it on later. a checkpoint holds everything the rest of the run
+## depends on: the players (in playerlist order, which the games and the sort depend on), the free history
+## slots, the history itself, the parameters, the generation reached and the state of both random number
+## generators, so a resumed run goes exactly the way the uninterrupted one would have.
+## the file is a short header and a binary pickle, written to a temporary file first and renamed over the
+## old checkpoint, so a run killed halfway through writing leaves the last good checkpoint behind
+##   pd.new_population(pd.mostly_defect)
+##   pd.evolve2(10**6,10,checkpoint = Checkpointer('run.ckpt'))
+## and after an interruption
+##   resume('run.ckpt',10**6,10)
+
+MAGIC = 'PDCK'
+VERSION = 1
+
+## module globals in prisoners_dilemma that change how a run goes
+PARAMS = ['d','c','n','percentagecooperate','percentagedefect','percentage_tit_for_tat','tit_for_tat_param',
+          'mutation_parameter','cruel_selection','numplayers']
+
+
+def state(gen):
+    '''everything needed to carry on from after generation gen'''
+    return {'gen': gen,
+            'players': [(player.name,player.strat.__name__,player.points,player.index) for player in pd.playerlist],
+            'freeslots': list(pd.freeslots),
+            'history': pd.playhistory.__getstate__(),
+            'params': dict((name,getattr(pd,name)) for name in PARAMS),
+            'strat_list': [strat.__name__ for strat in pd.strat_list],
+            'random': random.getstate(),
+            'numpy_random': numpy.random.get_state()}
+
+def set_state(saved):
+    '''put prisoners_dilemma back the way state found it. returns the generation it was taken at'''
+    for name, value in saved['params'].items():
+        setattr(pd,name,value)
+    ## strat_list, playerlist and freeslots are changed in place, other modules hold on to them
+    pd.strat_list[:] = by_name(saved['strat_list'])
+    pd.playhistory.__setstate__(saved['history'])
+    del pd.playerlist[:]
+    for name, strat, points, index in saved['players']:
+        ## not through Player.__init__, which would hand out a slot and wipe its history
+        player = pd.Player.__new__(pd.Player)
+        player.name = name
+        player.strat = by_name([strat])[0]
+        player.points = points
+        player.index = index
+        player.nextplay = None
+        pd.playerlist.append(player)
+    pd.freeslots[:] = saved['freeslots']
+    random.setstate(saved['random'])
+    numpy.random.set_state(saved['numpy_random'])
+    return saved['gen']
+
+
+def save(path,gen):
+    '''write a checkpoint of the run after generation gen to path, atomically'''
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix = '.' + os.path.basename(path),dir = directory)
+    try:
+        with os.fdopen(fd,'wb') as f:
+            f.write(MAGIC + chr(VERSION))
+            cPickle.dump(state(gen),f,cPickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(tmp,path)
+    except:
+        os.remove(tmp)
+        raise
+
+def load(path):
+    '''read a checkpoint and put prisoners_dilemma back the way it was. returns the generation reached'''
+    with open(path,'rb') as f:
+        header = f.read(len(MAGIC) + 1)
+        if header[:len(MAGIC)] != MAGIC:
+            raise ValueError('%s is not a checkpoint' % path)
+        if ord(header[len(MAGIC):]) != VERSION:
+            raise ValueError('%s is a version %d checkpoint, this reads version %d' % (path,ord(header[len(MAGIC):]),VERSION))
+        return set_state(cPickle.load(f))
+
+
+class Checkpointer(object):
+    def __init__(self,path,seconds = 5.0):
+        '''for evolve2's checkpoint: saves to path after a generation when seconds have passed since the
+        last save'''
+        self.path = path
+        self.seconds = seconds
+        self.last = time.time()
+        self.saved = 0
+
+    def __call__(self,gen):
+        if time.time() - self.last >= self.seconds:
+            save(self.path,gen)
+            self.last = time.time()
+            self.saved += 1
+
+
+def resume(path,numgens,numyears_pergen,**kwargs):
+    '''carry on the run checkpointed in path up to numgens generations, still checkpointing to path.
+    other arguments go to evolve2'''
+    start = load(path)
+    kwargs.setdefault('checkpoint',Checkpointer(path))
+    pd.evolve2(numgens,numyears_pergen,start = start,**kwargs)
+    return pd.playerlist
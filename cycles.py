@@ -0,0 +1,60 @@
+import prisoners_dilemma as pd
+from history import DEPTH
+from registry import lookup
+
+## two deterministic strategies playing each other go round the same few states forever once they
+## settle down: the state of the pair is just both players' last DEPTH moves, so it has to repeat within
+## 64 games. once it does, the points for every further lap of the cycle are known, and a match of any
+## length costs about as much as the transient plus one lap
+
+MASK = (1 << DEPTH) - 1
+
+## move tables for deterministic strategies, worked out from their kernels the first time they're needed
+_tables = {}
+
+def move_table(strat):
+    '''table[count][opp's last moves] = 1 if strat defects. raises ValueError for stochastic strategies'''
+    if strat not in _tables:
+        info = lookup(strat)
+        if info.stochastic or info.needs_everyone:
+            raise ValueError('%s is not deterministic' % info.name)
+        _tables[strat] = info.table().astype(int).tolist()
+    return _tables[strat]
+
+
+def play_match(strat1,strat2,numrounds,state1 = (0,0),state2 = (0,0)):
+    '''a match of numrounds games between deterministic strategies, without playing most of them.
+    state1 = (bits, count) for player 1's moves against player 2, as in PairHistory.state, state2 the
+    other way round. returns (points1, points2, state1, state2) at the end'''
+    table1 = move_table(strat1)
+    table2 = move_table(strat2)
+    payoff = [[pd.c,0],[pd.d,pd.n]]
+    bits1, count1 = state1
+    bits2, count2 = state2
+    points1 = points2 = 0
+    ## state -> (games played, points1, points2) when it was first seen
+    seen = {}
+    t = 0
+    while t < numrounds:
+        if seen is not None:
+            state = (bits1,count1,bits2,count2)
+            if state in seen:
+                t0, before1, before2 = seen[state]
+                laps = (numrounds - t) // (t - t0)
+                points1 += laps * (points1 - before1)
+                points2 += laps * (points2 - before2)
+                t += laps * (t - t0)
+                ## less than a lap left, play it out
+                seen = None
+                continue
+            seen[state] = (t,points1,points2)
+        move1 = table1[count1][bits2]
+        move2 = table2[count2][bits1]
+        points1 += payoff[move1][move2]
+        points2 += payoff[move2][move1]
+        bits1 = ((bits1 << 1) | move1) & MASK
+        bits2 = ((bits2 << 1) | move2) & MASK
+        count1 = min(count1 + 1,DEPTH)
+        count2 = min(count2 + 1,DEPTH)
+        t += 1
+    return points1, points2, (bits1,count1), (bits2,count2)
@@ -0,0 +1,106 @@
+import numpy
+
+import payoffcache
+import prisoners_dilemma as pd
+from markov import expected_payoffs
+
+## in evolve2 everyone plays everyone, so all that matters is how many players use each strategy.
+## these work on counts[s] = number of players using strats[s] and a table payoffs[s, t] = points s
+## gets from a match against t (markov.expected_payoffs), so a generation costs the same for 20 players
+## as for a million
+
+
+def strategy_payoffs(strats = pd.strat_list,numyears_pergen = 10,cache = payoffcache.cache):
+    '''expected points per match between every pair of strategies, for one generation. pairs already in
+    cache (payoffcache.py) are read from disk, None works everything out'''
+    if cache is None:
+        return expected_payoffs(strats,numyears_pergen)
+    return payoffcache.expected_payoffs(strats,numyears_pergen,cache)
+
+def fitness(counts,payoffs):
+    '''points a player of each strategy expects in a generation against everybody else'''
+    return payoffs.dot(counts) - payoffs.diagonal()
+
+def mutate(counts,mutation = None,rng = numpy.random):
+    '''every player switches to a random strategy (possibly the same one) with probability mutation'''
+    if mutation is None:
+        mutation = pd.mutation_parameter
+    leaving = rng.binomial(counts,mutation)
+    return counts - leaving + rng.multinomial(leaving.sum(),[1.0 / len(counts)] * len(counts))
+
+
+def evolve_counts(counts,payoffs,numgens,kill = None,mutation = None,rng = numpy.random):
+    '''evolve2 on counts: mutate, then the kill lowest scorers die and are replaced by copies of the top
+    scorer. all players of a strategy score the same here, so the losers come from the worst strategies'''
+    if kill is None:
+        kill = pd.cruel_selection
+    counts = numpy.array(counts,dtype=numpy.int64)
+    for i in range(numgens):
+        counts = mutate(counts,mutation,rng)
+        score = fitness(counts,payoffs)
+        present = numpy.flatnonzero(counts)
+        order = present[numpy.argsort(score[present])]
+        left = kill
+        for s in order:
+            dying = min(left,counts[s])
+            counts[s] -= dying
+            left -= dying
+            if not left:
+                break
+        counts[order[-1]] += kill
+    return counts
+
+def wright_fisher(counts,payoffs,numgens,mutation = None,rng = numpy.random):
+    '''non-overlapping generations: the next generation is drawn all at once, each player's parent picked
+    in proportion to its fitness, and then mutated'''
+    counts = numpy.array(counts,dtype=numpy.int64)
+    total = counts.sum()
+    for i in range(numgens):
+        weight = counts * numpy.maximum(fitness(counts,payoffs),0)
+        if weight.sum() == 0:
+            weight = counts.astype(float)
+        counts = mutate(rng.multinomial(total,weight / float(weight.sum())),mutation,rng)
+    return counts
+
+def moran(counts,payoffs,numsteps,mutation = None,rng = numpy.random):
+    '''one birth and one death per step: a parent is picked in proportion to fitness, its child mutates
+    with probability mutation, and replaces a player picked uniformly at random. a generation is about
+    sum(counts) steps'''
+    if mutation is None:
+        mutation = pd.mutation_parameter
+    counts = numpy.array(counts,dtype=numpy.int64)
+    num = len(counts)
+    for i in range(numsteps):
+        weight = counts * numpy.maximum(fitness(counts,payoffs),0)
+        if weight.sum() == 0:
+            weight = counts.astype(float)
+        child = rng.choice(num,p=weight / float(weight.sum()))
+        if rng.random_sample() < mutation:
+            child = rng.randint(num)
+        counts[rng.choice(num,p=counts / float(counts.sum()))] -= 1
+        counts[child] += 1
+    return counts
+
+
+def replicator(shares,payoffs,time,dt = 0.01,mutation = 0.0):
+    '''infinite population: shares[s] = fraction using strats[s] follows
+    d shares/dt = shares * (fitness - mean fitness) + mutation * (1/S - shares),
+    integrated with fourth order runge kutta up to time'''
+    shares = numpy.array(shares,dtype=float)
+    shares /= shares.sum()
+    num = len(shares)
+
+    def slope(x):
+        fit = payoffs.dot(x)
+        return x * (fit - x.dot(fit)) + mutation * (1.0 / num - x)
+
+    for i in range(int(round(time / dt))):
+        k1 = slope(shares)
+        k2 = slope(shares + dt / 2 * k1)
+        k3 = slope(shares + dt / 2 * k2)
+        k4 = slope(shares + dt * k3)
+        shares = shares + dt / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+        ## keep rounding errors from pushing shares off the simplex
+        shares = numpy.maximum(shares,0)
+        shares /= shares.sum()
+    return shares
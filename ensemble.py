@@ -0,0 +1,56 @@
+import multiprocessing
+import random
+from collections import Counter
+
+import numpy
+
+import prisoners_dilemma as pd
+from registry import lookup
+
+## runs of evolve2 are incredibly variable, so this runs lots of them side by side in a process pool and
+## collects which strategies survive. every worker has its own copy of prisoners_dilemma's globals, so
+## replicas can't see each other's players. only the survivor counts come back from each replica
+
+
+def run_replica(args):
+    '''one independent evolve2 run. args = (seed, numgens, numyears_pergen, name of initial strategy)
+    returns a Counter of strategy name -> number of survivors'''
+    seed, numgens, numyears_pergen, initial = args
+    random.seed(seed)
+    numpy.random.seed(seed)
+    pd.new_population(lookup(initial).func)
+    pd.evolve2(numgens,numyears_pergen,toPrint = False)
+    return Counter(player.strat.__name__ for player in pd.playerlist)
+
+
+def run_ensemble(numreplicas,numgens,numyears_pergen,initial = 'mostly_defect',seed = 0,processes = None):
+    '''runs numreplicas copies of evolve2, replica k seeded with seed + k, so the whole ensemble is
+    repeatable. processes = size of the pool, one per core by default
+    returns (totals, hist): totals[name] = survivors using strategy name over all replicas,
+    hist[name][k] = number of replicas that finished with exactly k survivors using name'''
+    tasks = [(seed + k,numgens,numyears_pergen,initial) for k in range(numreplicas)]
+    processes = processes or multiprocessing.cpu_count()
+    pool = multiprocessing.Pool(processes)
+    ## a few chunks per worker keeps the pool busy without sending every replica separately
+    chunksize = max(1,numreplicas // (4 * processes))
+    totals = Counter()
+    hist = {}
+    try:
+        for counts in pool.imap_unordered(run_replica,tasks,chunksize):
+            totals.update(counts)
+            for name in counts:
+                hist.setdefault(name,Counter())[counts[name]] += 1
+    finally:
+        pool.close()
+        pool.join()
+    ## strategies that died out in a replica count as 0 survivors in it
+    for name in hist:
+        hist[name][0] = numreplicas - sum(hist[name].values())
+    return totals, hist
+
+
+def print_histogram(totals,hist):
+    for name, total in totals.most_common():
+        print name, total
+        for k in sorted(hist[name]):
+            print '   %3d survivors in %d replicas' % (k,hist[name][k])
@@ -0,0 +1,143 @@
+import array
+
+import numpy
+
+## compact record of who played what against whom, shared by all players. each ordered pair of
+## players gets a few bits holding its most recent moves, so memory stays the same however many
+## games are played. no strategy in strat_list looks back further than 3 moves.
+## the numbers live in flat stdlib arrays, so the one-game-at-a-time methods below are plain python
+## indexing, and bits/count/lastplay are numpy views onto the same memory for whole-round work
+
+COOPERATE = 0
+DEFECT = 1
+DEPTH = 3
+
+
+def _typecode(depth):
+    for typecode in 'BHIL':
+        if depth <= 8 * array.array(typecode).itemsize:
+            return typecode
+    raise ValueError('can only remember up to %d moves per pair, not %d' % (8 * array.array('L').itemsize,depth))
+
+def _view(flat,shape):
+    return numpy.frombuffer(flat,dtype=flat.typecode).reshape(shape)
+
+
+class PairHistory(object):
+    def __init__(self,size,depth = DEPTH):
+        '''size = number of player slots, depth = how many moves to remember per pair'''
+        self.depth = depth
+        self.mask = (1 << depth) - 1
+        self.size = size
+        ## _bits[i*size + j] = i's last depth moves against j, most recent move in bit 0, 1 = defect
+        ## _count[i*size + j] = how many moves i has made against j, stops counting at depth
+        self._bits = array.array(_typecode(depth),[0]) * (size * size)
+        self._count = array.array('B',[0]) * (size * size)
+        ## _lastplay[i] = i's most recent move against anybody, -1 if it hasn't played yet
+        self._lastplay = array.array('b',[-1]) * size
+        self._views()
+
+    def _views(self):
+        self.bits = _view(self._bits,(self.size,self.size))
+        self.count = _view(self._count,(self.size,self.size))
+        self.lastplay = _view(self._lastplay,(self.size,))
+
+    def __len__(self):
+        return self.size
+
+    def __getstate__(self):
+        ## the numpy views can't be pickled along with the arrays they look at, so save the raw bytes
+        return {'depth': self.depth,'size': self.size,'typecode': self._bits.typecode,
+                'bits': self._bits.tostring(),'count': self._count.tostring(),'lastplay': self._lastplay.tostring()}
+
+    def __setstate__(self,state):
+        self.depth = state['depth']
+        self.mask = (1 << self.depth) - 1
+        self.size = state['size']
+        self._bits = array.array(state['typecode'],state['bits'])
+        self._count = array.array('B',state['count'])
+        self._lastplay = array.array('b',state['lastplay'])
+        self._views()
+
+    def grow(self,size):
+        '''make room for at least size players, keeping what's recorded'''
+        old = self.size
+        if size <= old:
+            return
+        ## at least doubling, so adding players one at a time copies O(N**2) in all rather than O(N**3)
+        size = max(size,2 * old)
+        bits, count = self.bits, self.count
+        self.size = size
+        self._bits = array.array(self._bits.typecode,[0]) * (size * size)
+        self._count = array.array('B',[0]) * (size * size)
+        lastplay = self.lastplay
+        self._lastplay = array.array('b',[-1]) * size
+        self._views()
+        self.bits[:old,:old] = bits
+        self.count[:old,:old] = count
+        self.lastplay[:old] = lastplay
+
+    def reset(self,i):
+        '''forget everything slot i has played, and everything played against it'''
+        self.bits[i,:] = 0
+        self.bits[:,i] = 0
+        self.count[i,:] = 0
+        self.count[:,i] = 0
+        self.lastplay[i] = -1
+
+    def record(self,i,j,move):
+        '''i made move (COOPERATE or DEFECT) against j'''
+        k = i * self.size + j
+        self._bits[k] = ((self._bits[k] << 1) | move) & self.mask
+        if self._count[k] < self.depth:
+            self._count[k] += 1
+        self._lastplay[i] = move
+
+    def record_all(self,moves):
+        '''record a whole round at once: moves[i,j] = True where i defected against j.
+        lastplay isn't touched, since it depends on the order the games were played in'''
+        self.bits[...] = ((self.bits << 1) | moves) & self.mask
+        self.count[...] = numpy.minimum(self.count + 1,self.depth)
+        ## nobody plays themselves
+        numpy.fill_diagonal(self.bits,0)
+        numpy.fill_diagonal(self.count,0)
+
+    def played(self,i,j):
+        '''how many moves i has made against j, up to depth'''
+        return self._count[i * self.size + j]
+
+    def last(self,i,j,k = 1):
+        '''i's last k moves against j as bits, most recent move in bit 0'''
+        return self._bits[i * self.size + j] & ((1 << k) - 1)
+
+    def lastmove(self,i):
+        '''i's most recent move against anybody, -1 if it hasn't played yet'''
+        return self._lastplay[i]
+
+    def streak(self,i,j,k,move):
+        '''True if i's last k moves against j were all move'''
+        if self._count[i * self.size + j] < k:
+            return False
+        mask = (1 << k) - 1
+        if move == DEFECT:
+            return self._bits[i * self.size + j] & mask == mask
+        return self._bits[i * self.size + j] & mask == 0
+
+    def state(self,i,j):
+        '''(bits, count) for i's moves against j, see record'''
+        k = i * self.size + j
+        return self._bits[k], self._count[k]
+
+    def set_state(self,i,j,bits,count):
+        '''overwrite i's record against j with something state returned. if i has played j,
+        that game is also taken to be i's most recent one'''
+        k = i * self.size + j
+        self._bits[k] = bits
+        self._count[k] = count
+        if count:
+            self._lastplay[i] = bits & 1
+
+    def moves(self,i,j):
+        '''i's remembered moves against j as strings, oldest first. for printing'''
+        bits = self._bits[i * self.size + j]
+        return [('defect' if bits >> k & 1 else 'cooperate') for k in range(self.played(i,j) - 1,-1,-1)]
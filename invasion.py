@@ -0,0 +1,149 @@
+import argparse
+import multiprocessing
+
+import numpy
+
+import prisoners_dilemma as pd
+from dynamics import moran, strategy_payoffs
+from registry import by_name
+
+## which strategies can invade which. a population of num players all using a resident strategy gets k
+## players using a mutant instead, and everyone plays everyone, so a player's points for the generation
+## only depend on how many of each there are and on payoffs[s, t] (dynamics.strategy_payoffs). that makes
+## every (resident, mutant) pair a few array operations on the one payoff table, instead of a long
+## evolve2 run from each initial_strat.
+## matrices here are indexed [resident, mutant]
+
+def pair_fitness(payoffs,num,k):
+    '''(mutant, resident) points per generation with k mutants among num players, as [resident, mutant]
+    arrays. k can be an array of counts, which adds a last axis'''
+    k = numpy.asarray(k,dtype=float)
+    counts = k[...,None,None]
+    same = payoffs.diagonal()
+    ## against the other mutants and against the residents
+    mutant = (counts - 1) * same[None,:] + (num - counts) * payoffs.T
+    resident = (num - counts - 1) * same[:,None] + counts * payoffs
+    if k.ndim:
+        return numpy.moveaxis(mutant,0,-1), numpy.moveaxis(resident,0,-1)
+    return mutant, resident
+
+def invasion_fitness(payoffs,num = None,k = 1):
+    '''how many more points each of k mutants gets than a resident, for every pair'''
+    if num is None:
+        num = pd.numplayers
+    mutant, resident = pair_fitness(payoffs,num,k)
+    return mutant - resident
+
+def fixation_probability(payoffs,num = None,k = 1,intensity = None):
+    '''chance that k mutants take over a population of num in a moran process (one birth and one death
+    at a time, parents picked in proportion to fitness), for every pair. intensity = None uses the points
+    as fitness, like dynamics.moran, otherwise fitness is 1 - intensity + intensity * points per game'''
+    if num is None:
+        num = pd.numplayers
+    mutant, resident = pair_fitness(payoffs,num,numpy.arange(1,num))
+    if intensity is not None:
+        mutant = 1 - intensity + intensity * mutant / (num - 1)
+        resident = 1 - intensity + intensity * resident / (num - 1)
+    tiny = numpy.finfo(float).tiny
+    ## rho_k = sum of the first k terms / sum of all num, the terms being products of resident/mutant fitness
+    ## ratios (1 for the first). in logs, so long products don't overflow
+    logs = numpy.cumsum(numpy.log(numpy.maximum(resident,tiny)) - numpy.log(numpy.maximum(mutant,tiny)),axis=-1)
+    terms = numpy.concatenate([numpy.zeros(payoffs.shape + (1,)),logs],axis=-1)
+    top = terms.max(axis=-1)[...,None]
+    weights = numpy.exp(terms - top)
+    return weights[...,:k].sum(axis=-1) / weights.sum(axis=-1)
+
+
+def invasibility(strats = pd.strat_list,numyears_pergen = 10,num = None,k = 1,intensity = None,payoffs = None):
+    '''everything at once, for every (resident, mutant) pair of strats:
+    'fitness' = invasion_fitness, 'fixation' = fixation_probability, 'neutral' = k / num, the fixation
+    probability without selection, and 'invades' = True where the mutants do better than the residents
+    and are likelier to take over than by drift'''
+    if num is None:
+        num = pd.numplayers
+    if payoffs is None:
+        payoffs = strategy_payoffs(strats,numyears_pergen)
+    fitness = invasion_fitness(payoffs,num,k)
+    fixation = fixation_probability(payoffs,num,k,intensity)
+    neutral = k / float(num)
+    invades = (fitness > 0) & (fixation > neutral)
+    numpy.fill_diagonal(invades,False)
+    return {'strats': list(strats),'payoffs': payoffs,'fitness': fitness,'fixation': fixation,
+            'neutral': neutral,'invades': invades}
+
+def uninvadable(result):
+    '''the strategies no mutant can invade'''
+    return [strat for strat, row in zip(result['strats'],result['invades']) if not row.any()]
+
+def evolutionarily_stable(payoffs):
+    '''True for resident r if every mutant m does worse against r than r does (payoffs[m, r] <
+    payoffs[r, r]), or as well but worse against itself than r does against it: the textbook ESS
+    conditions for an infinite population'''
+    same = payoffs.diagonal()
+    strict = payoffs < same[None,:]
+    tie = numpy.isclose(payoffs,same[None,:]) & (same[:,None] < payoffs.T)
+    stable = strict | tie
+    numpy.fill_diagonal(stable,True)
+    return stable.all(axis=0)
+
+
+def _simulate(args):
+    payoffs, resident, mutant, num, k, trials, seed = args
+    rng = numpy.random.RandomState(seed)
+    sub = payoffs[numpy.ix_([resident,mutant],[resident,mutant])]
+    fixed = 0
+    for t in range(trials):
+        counts = numpy.array([num - k,k])
+        while 0 < counts[1] < num:
+            counts = moran(counts,sub,1,mutation = 0,rng = rng)
+        fixed += counts[1] == num
+    return fixed
+
+def simulated_fixation(payoffs,num = None,k = 1,trials = 1000,seed = 0,processes = None):
+    '''fixation_probability estimated by running the moran process trials times for every pair, spread
+    over a process pool. slow, for checking the exact numbers'''
+    if num is None:
+        num = pd.numplayers
+    size = len(payoffs)
+    tasks = [(payoffs,r,m,num,k,trials,seed + r * size + m) for r in range(size) for m in range(size)]
+    pool = multiprocessing.Pool(processes or multiprocessing.cpu_count())
+    try:
+        fixed = pool.map(_simulate,tasks)
+    finally:
+        pool.close()
+        pool.join()
+    return numpy.array(fixed,dtype=float).reshape(size,size) / trials
+
+
+def print_matrix(result):
+    names = [strat.__name__ for strat in result['strats']]
+    width = max(len(name) for name in names)
+    print '%*s    %s' % (width,'resident \\ mutant',' '.join('%-5d' % m for m in range(len(names))))
+    for r, name in enumerate(names):
+        cells = []
+        for m in range(len(names)):
+            mark = '*' if result['invades'][r,m] else ' '
+            cells.append('%4.2f%s' % (result['fixation'][r,m],mark))
+        print '%*s %2d %s' % (width,name,r,' '.join(cells))
+    print 'fixation probabilities, * = mutant invades. neutral = %.3f' % result['neutral']
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'which strategies can invade which')
+    parser.add_argument('--strategies',nargs = '+',help = 'names, all of strat_list by default')
+    parser.add_argument('--players',type = int,default = pd.numplayers)
+    parser.add_argument('--invaders',type = int,default = 1)
+    parser.add_argument('--years',type = int,default = 10,help = 'rounds played per generation')
+    parser.add_argument('--intensity',type = float,help = 'strength of selection, points are fitness by default')
+    args = parser.parse_args(argv)
+    try:
+        strats = by_name(args.strategies) if args.strategies else pd.strat_list
+    except KeyError as e:
+        parser.error(e.args[0])
+    result = invasibility(strats,args.years,args.players,args.invaders,args.intensity)
+    print_matrix(result)
+    print 'nothing invades:',', '.join(strat.__name__ for strat in uninvadable(result)) or 'none'
+    stable = evolutionarily_stable(result['payoffs'])
+    print 'ESS in an infinite population:',', '.join(strat.__name__ for strat, ess in zip(strats,stable) if ess) or 'none'
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+import numpy
+
+import prisoners_dilemma as pd
+from vectorized import kernels, payoff_table, play_block
+
+## random numbers that don't depend on the order they're asked for in. the global random module hands
+## out numbers in sequence, so a strategy's coin flip depends on how many games were played before it,
+## and a run changes as soon as the games are batched or split over processes. here every draw is a hash
+## of its key (seed, purpose, generation, round, player i, player j), worked out for whole arrays of keys
+## at once, so the same game gets the same number however, wherever and in whatever order it's played.
+## the vectorized engine (VectorizedGame, play_block), ParallelRound and play_round_serial below all take
+## a Streams and then agree exactly
+##   rounds = KeyedRounds(seed = 1)
+##   pd.evolve2(100,10,toPrint = False,playrounds = rounds.play_rounds)
+
+## what a draw is for, so different uses of the same game never share a number
+MOVE = 1
+ORDER = 2
+
+## splitmix64 (Steele, Lea and Flood), a good 64 bit mixing function
+_GAMMA = numpy.uint64(0x9E3779B97F4A7C15)
+_MULT1 = numpy.uint64(0xBF58476D1CE4E5B9)
+_MULT2 = numpy.uint64(0x94D049BB133111EB)
+_SHIFTS = [numpy.uint64(k) for k in (30,27,31,11)]
+
+def _mix(x):
+    z = x + _GAMMA
+    z = (z ^ (z >> _SHIFTS[0])) * _MULT1
+    z = (z ^ (z >> _SHIFTS[1])) * _MULT2
+    return z ^ (z >> _SHIFTS[2])
+
+
+class Streams(object):
+    def __init__(self,seed = 0):
+        self.seed = seed
+        with numpy.errstate(over='ignore'):
+            self.key = _mix(numpy.uint64(seed))
+
+    def __getstate__(self):
+        return {'seed': self.seed}
+
+    def __setstate__(self,state):
+        self.__init__(state['seed'])
+
+    def uniform(self,purpose,*fields):
+        '''one uniform number in [0, 1) for each key: the fields are arrays (or numbers) of non-negative
+        integers, broadcast together like numpy arithmetic'''
+        with numpy.errstate(over='ignore'):
+            h = self.key ^ numpy.uint64(purpose)
+            for field in fields:
+                h = _mix(h ^ numpy.asarray(field,dtype=numpy.uint64))
+        ## the top 53 bits, all a double can hold
+        return (h >> _SHIFTS[3]) * (1.0 / (1 << 53))
+
+    def moves(self,gen,round,i,j):
+        '''the number player i uses for its move against player j in round round of generation gen'''
+        return self.uniform(MOVE,gen,round,i,j)
+
+    def permutation(self,num,gen,round):
+        '''an order for num games in a round, the same each time for the same key'''
+        return numpy.argsort(self.uniform(ORDER,gen,round,numpy.arange(num)),kind='mergesort')
+
+
+def play_round_serial(strats,history,slots,streams,gen,round):
+    '''one round played a game at a time, in an order drawn from streams, like play(). gives exactly what
+    play_block with the same streams gives. returns each player's points'''
+    num = len(strats)
+    pairs = [(a,b) for a in range(num) for b in range(a + 1,num)]
+    table = payoff_table()
+    points = numpy.zeros(num)
+    for k in streams.permutation(len(pairs),gen,round):
+        a, b = pairs[k]
+        i, j = slots[a], slots[b]
+        ## each side sees the other's moves against it
+        bits_a, count_a = history.state(j,i)
+        bits_b, count_b = history.state(i,j)
+        move_a = int(kernels[strats[a]](numpy.array([bits_a]),numpy.array([count_a]),streams.moves(gen,round,[i],[j]))[0])
+        move_b = int(kernels[strats[b]](numpy.array([bits_b]),numpy.array([count_b]),streams.moves(gen,round,[j],[i]))[0])
+        history.record(i,j,move_a)
+        history.record(j,i,move_b)
+        points[a] += table[move_a,move_b]
+        points[b] += table[move_b,move_a]
+    return points
+
+
+class KeyedRounds(object):
+    def __init__(self,seed = 0,players = pd.playerlist,batched = True):
+        '''drop in playrounds for evolve1/evolve2 with keyed draws. batched = whole rounds at once with the
+        vectorized engine, otherwise game by game; both play the same games'''
+        self.streams = Streams(seed)
+        self.players = players
+        self.batched = batched
+        ## generation the next call is for
+        self.gen = 0
+
+    def play_rounds(self,numrounds):
+        strats = [player.strat for player in self.players]
+        slots = [player.index for player in self.players]
+        if self.batched:
+            points = play_block(strats,pd.playhistory,slots,numrounds,streams = self.streams,gen = self.gen)
+        else:
+            points = numpy.zeros(len(strats))
+            for t in range(numrounds):
+                points += play_round_serial(strats,pd.playhistory,slots,self.streams,self.gen,t)
+        for k, player in enumerate(self.players):
+            player.addpoints(points[k])
+        self.gen += 1
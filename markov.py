@@ -0,0 +1,135 @@
+import numpy
+
+import prisoners_dilemma as pd
+from history import DEPTH
+from registry import defect_table
+from vectorized import payoff_table
+
+## exact expected payoffs between strategies, instead of sampling them with play().
+## every strategy in strat_list decides from the opponent's last few moves and one random number, so a
+## pair of players is a markov chain whose state is (number of games so far, up to DEPTH; first player's
+## last moves; second player's last moves). the state is packed as count*64 + mine*8 + theirs, which
+## is 256 states of which 85 can actually happen
+
+NUMSTATES = (DEPTH + 1) << (2 * DEPTH)
+## after DEPTH games the count stops changing, and only the last 64 states are ever visited again
+STEADY = DEPTH << (2 * DEPTH)
+## the four outcomes of a game: (first player defects, second player defects)
+OUTCOMES = [(0,0),(0,1),(1,0),(1,1)]
+
+
+def _unpack(state):
+    count = state >> (2 * DEPTH)
+    mine = (state >> DEPTH) & ((1 << DEPTH) - 1)
+    theirs = state & ((1 << DEPTH) - 1)
+    return count, mine, theirs
+
+def _next_states():
+    '''nxt[state, outcome] = the state after a game with that outcome'''
+    nxt = numpy.zeros((NUMSTATES,4),dtype=numpy.intp)
+    for state in range(NUMSTATES):
+        count, mine, theirs = _unpack(state)
+        after = min(count + 1,DEPTH)
+        mask = (1 << after) - 1
+        for o, (move1, move2) in enumerate(OUTCOMES):
+            nxt[state,o] = (after << (2 * DEPTH)) | ((((mine << 1) | move1) & mask) << DEPTH) | (((theirs << 1) | move2) & mask)
+    return nxt
+
+nxt = _next_states()
+
+
+def _outcome_probs(strats):
+    '''probs[x, y, state, outcome] for strategy x playing strategy y, and reward[x, y, state] = x's
+    expected points for the next game'''
+    tables = numpy.array([defect_table(strat) for strat in strats])
+    count, mine, theirs = _unpack(numpy.arange(NUMSTATES))
+    ## the first player looks at what the second has played, and the other way round
+    p1 = tables[:,count,theirs][:,None,:]
+    p2 = tables[:,count,mine][None,:,:]
+    probs = numpy.zeros((len(strats),len(strats),NUMSTATES,4))
+    for o, (move1, move2) in enumerate(OUTCOMES):
+        probs[...,o] = (p1 if move1 else 1 - p1) * (p2 if move2 else 1 - p2)
+    payoff = payoff_table()
+    reward = sum(probs[...,o] * payoff[move1,move2] for o, (move1, move2) in enumerate(OUTCOMES))
+    return probs, reward
+
+def _step(dist,probs):
+    '''distribution over states after one more game'''
+    after = numpy.zeros((NUMSTATES,) + dist.shape[:-1])
+    for o in range(4):
+        numpy.add.at(after,nxt[:,o],numpy.moveaxis(dist * probs[...,o],-1,0))
+    return numpy.moveaxis(after,0,-1)
+
+def _steady_matrix(probs):
+    '''transitions among the 64 states reachable once the count has stopped changing'''
+    states = numpy.arange(STEADY,NUMSTATES)
+    trans = numpy.zeros(probs.shape[:2] + (len(states),len(states)))
+    for o in range(4):
+        trans[...,states - STEADY,nxt[states,o] - STEADY] += probs[...,states,o]
+    return trans
+
+
+def expected_payoffs(strats = pd.strat_list,numrounds = None):
+    '''payoffs[x, y] = expected points strategy x gets from a match against strategy y, starting with
+    no history. numrounds = length of the match; None gives the long run average points per game instead'''
+    probs, reward = _outcome_probs(strats)
+    dist = numpy.zeros(reward.shape)
+    dist[...,0] = 1.0
+    total = numpy.zeros(reward.shape[:2])
+    ## the first few games, while the count is still going up
+    played = 0
+    while played < DEPTH and (numrounds is None or played < numrounds):
+        total += (dist * reward).sum(axis=-1)
+        dist = _step(dist,probs)
+        played += 1
+    dist = dist[...,STEADY:]
+    trans = _steady_matrix(probs)
+    reward = reward[...,STEADY:]
+    if numrounds is None:
+        return _long_run(dist,trans,reward)
+    return total + (dist * _total_reward(trans,reward,numrounds - played)).sum(axis=-1)
+
+def _total_reward(trans,reward,numrounds):
+    '''value[..., state] = expected points over numrounds games starting from state, by repeated squaring:
+    power = trans**(2**k) and block = expected points over 2**k games'''
+    value = numpy.zeros(reward.shape)
+    power, block = trans, reward
+    while numrounds:
+        if numrounds & 1:
+            ## play 2**k games first, then the ones already counted in value
+            value = block + numpy.matmul(power,value[...,None])[...,0]
+        block = block + numpy.matmul(power,block[...,None])[...,0]
+        power = numpy.matmul(power,power)
+        numrounds >>= 1
+    return value
+
+def _long_run(dist,trans,reward):
+    '''average points per game in the long run. chains can be periodic or split into several closed
+    classes (deterministic pairs do both), so solve g = P g, g + (I - P) h = r, which fixes the gain g
+    exactly for any finite chain'''
+    num = reward.shape[-1]
+    eye = numpy.eye(num)
+    gain = numpy.zeros(reward.shape[:2])
+    for x in range(reward.shape[0]):
+        for y in range(reward.shape[1]):
+            left = numpy.block([[eye - trans[x,y],numpy.zeros((num,num))],[eye,eye - trans[x,y]]])
+            right = numpy.concatenate([numpy.zeros(num),reward[x,y]])
+            solution = numpy.linalg.lstsq(left,right,rcond=None)[0]
+            gain[x,y] = dist[x,y].dot(solution[:num])
+    return gain
+
+
+def play_multiple_rounds_expected(numrounds,players = pd.playerlist,table = expected_payoffs):
+    '''drop in for play_multiple_rounds that gives every player its expected points instead of sampled ones.
+    every pairing is treated as a fresh match, and pd.playhistory isn't touched. table(strats, numrounds)
+    gives the payoffs, e.g. payoffcache.expected_payoffs'''
+    strats = sorted(set(player.strat for player in players),key=lambda strat: strat.__name__)
+    which = dict((strat,x) for x, strat in enumerate(strats))
+    payoffs = table(strats,numrounds)
+    mix = numpy.zeros(len(strats))
+    for player in players:
+        mix[which[player.strat]] += 1
+    for player in players:
+        x = which[player.strat]
+        ## against everyone else, not against itself
+        player.addpoints(payoffs[x].dot(mix) - payoffs[x,x])
@@ -0,0 +1,82 @@
+import random
+from collections import OrderedDict
+
+import cycles
+import prisoners_dilemma as pd
+import registry
+
+## when both players of a pair use deterministic strategies, a match between them always goes the same
+## way from the same starting history, so the result only has to be worked out once. after a few
+## generations of evolve2 most of the population shares a handful of strategies, so most matches repeat
+
+## strategies whose move depends only on the history of the pair. tit_for_tat_1 is deterministic too,
+## but it looks at the opponent's games against everybody else, so it can't be cached per pair
+deterministic = registry.deterministic()
+
+
+class MatchCache(object):
+    def __init__(self,maxsize = 100000):
+        '''maxsize = most match results to keep. the least recently used ones are dropped first'''
+        self.maxsize = maxsize
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        ## matches involving a stochastic strategy, which are always played out
+        self.bypassed = 0
+
+    def get(self,key):
+        result = self.results.pop(key,None)
+        if result is None:
+            self.misses += 1
+            return None
+        ## put it back at the recent end
+        self.results[key] = result
+        self.hits += 1
+        return result
+
+    def put(self,key,result):
+        self.results[key] = result
+        if len(self.results) > self.maxsize:
+            self.results.popitem(last = False)
+
+    def clear(self):
+        self.results.clear()
+        self.hits = self.misses = self.bypassed = 0
+
+    def stats(self):
+        return {'hits': self.hits,'misses': self.misses,'bypassed': self.bypassed,'size': len(self.results)}
+
+cache = MatchCache()
+
+
+def play_match(player1,player2,numrounds,cache = cache):
+    '''player1 and player2 play each other numrounds times in a row'''
+    history = pd.playhistory
+    i, j = player1.index, player2.index
+    if player1.strat not in deterministic or player2.strat not in deterministic:
+        cache.bypassed += 1
+        for t in range(numrounds):
+            pd.play(player1,player2)
+        return
+    ## the payoffs are part of the key, so changing d, c or n doesn't hand back old points
+    key = (player1.strat,player2.strat,history.state(i,j),history.state(j,i),numrounds,pd.d,pd.c,pd.n)
+    result = cache.get(key)
+    if result is None:
+        ## worked out a lap of the pair's cycle at a time rather than game by game
+        result = cycles.play_match(player1.strat,player2.strat,numrounds,history.state(i,j),history.state(j,i))
+        cache.put(key,result)
+    points1, points2, state1, state2 = result
+    player1.addpoints(points1)
+    player2.addpoints(points2)
+    history.set_state(i,j,*state1)
+    history.set_state(j,i,*state2)
+
+
+def play_multiple_rounds_cached(numrounds,players = pd.playerlist,cache = cache):
+    '''drop in for play_multiple_rounds that plays each pairing as one match of numrounds games, so
+    deterministic pairs can come out of the cache. the games of a pair don't depend on the other
+    pairs, so the points are the same as playing round by round'''
+    pairs = [(players[i],players[j]) for j in range(len(players)) for i in range(j + 1,len(players))]
+    random.shuffle(pairs)
+    for player1, player2 in pairs:
+        play_match(player1,player2,numrounds,cache)
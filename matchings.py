@@ -0,0 +1,224 @@
+import multiprocessing
+
+import numpy
+
+import prisoners_dilemma as pd
+import registry
+from population import Population
+from topology import EdgeHistory, play_rows
+
+## one big population using every core. a round is split into N-1 perfect matchings (the circle method
+## for round robin tournaments), so within a matching nobody plays twice. every pair belongs to one
+## worker process for good, and that worker keeps the history for its pairs, so only strategy ids and
+## points go back and forth.
+## almost every strategy only looks at its own pair's history, so a worker can play all its games of a
+## round at once. strategies in needs_everyone look at other pairs' games too (tit_for_tat_1 looks at the
+## opponent's last move against anybody), so when one of those is around the round goes one matching at a
+## time, and everybody's latest move is passed round between matchings.
+## ParallelRounds hooks it up to population.evolve or pd.evolve2
+##   rounds = ParallelRounds(pd.strat_list,1000)
+##   pop = rounds.population(1000,pd.always_cooperate)
+##   population.evolve(pop,100,10,playrounds = rounds.play_population)
+
+needs_everyone = registry.needs_everyone()
+
+
+def circle_matchings(num):
+    '''the N-1 rounds of a round robin among num players, as lists of (i, j) pairs. with an odd number of
+    players somebody sits out each matching'''
+    slots = list(range(num))
+    if num % 2:
+        slots.append(None)
+    half = len(slots) // 2
+    matchings = []
+    for r in range(len(slots) - 1):
+        pairs = [(slots[k],slots[-1 - k]) for k in range(half)]
+        matchings.append([(min(i,j),max(i,j)) for i, j in pairs if i is not None and j is not None])
+        ## keep the first slot still and rotate the rest one place
+        slots = [slots[0],slots[-1]] + slots[1:-1]
+    return matchings
+
+
+class _Shard(object):
+    '''the pairs one worker owns and their history'''
+    def __init__(self,edges,matching,strats,seed,worker,streams = None):
+        self.history = EdgeHistory(edges)
+        self.matching = numpy.asarray(matching,dtype=numpy.intp)
+        self.strats = strats
+        self.ids = None
+        self.alive = None
+        ## a stream of its own for every worker, so a run is repeatable for a given number of workers
+        self.rng = numpy.random.RandomState([seed,worker])
+        ## or draws keyed by game, which don't depend on the number of workers at all
+        self.streams = streams
+
+    def play(self,rows,numplayers,lastplay = None,key = (0,0)):
+        '''one game along each of rows between live players. returns each player's points and, for the
+        players that played, their move. key = (generation, round), for streams'''
+        rows = rows[self.alive[self.history.edges[rows]].all(axis=1)]
+        if self.streams is None:
+            draw = None
+        else:
+            draw = lambda t, decider, opponent: self.streams.moves(key[0],key[1],decider,opponent)
+        return play_rows(self.history,rows,self.strats,self.ids,1,numplayers,self.rng,draw,lastplay)
+
+def _worker(conn,edges,matching,strats,seed,worker,streams):
+    shard = _Shard(edges,matching,strats,seed,worker,streams)
+    everything = numpy.arange(len(shard.matching))
+    while True:
+        message = conn.recv()
+        if message[0] == 'stop':
+            break
+        elif message[0] == 'strats':
+            shard.ids, shard.alive = message[1:]
+        elif message[0] == 'reset':
+            for slot in message[1]:
+                shard.history.reset(slot)
+        elif message[0] == 'round':
+            numplayers, key = message[1:]
+            conn.send(shard.play(everything,numplayers,key = key)[0])
+        elif message[0] == 'matching':
+            m, numplayers, lastplay, key = message[1:]
+            conn.send(shard.play(numpy.flatnonzero(shard.matching == m),numplayers,lastplay,key))
+    conn.close()
+
+
+class ParallelRound(object):
+    def __init__(self,strats,strat_ids,numworkers = None,seed = 0,streams = None,alive = None):
+        '''strats = strategy functions, strat_ids[i] = which one player i uses, alive[i] = whether player i
+        is there to play (everybody by default)
+        numworkers = processes to spread the pairs over, one per core by default
+        streams = a keyed.Streams, for moves that come out the same with any number of workers. the
+        draws are keyed by gen (set it before each generation) and the round'''
+        self.strats = list(strats)
+        self.numplayers = len(strat_ids)
+        self.numworkers = numworkers or multiprocessing.cpu_count()
+        self.matchings = circle_matchings(self.numplayers)
+        ## pair k of matching m goes to worker (k + m) % numworkers, so every worker gets a fair share
+        ## of every matching
+        shards = [([],[]) for w in range(self.numworkers)]
+        for m, pairs in enumerate(self.matchings):
+            for k, pair in enumerate(pairs):
+                edges, matching = shards[(k + m) % self.numworkers]
+                edges.append(pair)
+                matching.append(m)
+        self.conns = []
+        self.workers = []
+        for w, (edges, matching) in enumerate(shards):
+            parent, child = multiprocessing.Pipe()
+            edges = numpy.array(edges,dtype=numpy.intp).reshape(-1,2)
+            worker = multiprocessing.Process(target=_worker,args=(child,edges,matching,self.strats,seed,w,streams))
+            worker.daemon = True
+            worker.start()
+            self.conns.append(parent)
+            self.workers.append(worker)
+        ## latest move of every player against anybody, only kept up when needs_everyone is in play
+        self.lastplay = numpy.zeros(self.numplayers,dtype=numpy.int8) - 1
+        self.gen = 0
+        self.set_strat_ids(strat_ids,alive)
+
+    def _send(self,message):
+        for conn in self.conns:
+            conn.send(message)
+
+    def set_strat_ids(self,strat_ids,alive = None):
+        self.strat_ids = numpy.array(strat_ids,dtype=numpy.intp)
+        self.alive = numpy.ones(self.numplayers,dtype=bool) if alive is None else numpy.array(alive,dtype=bool)
+        self._send(('strats',self.strat_ids,self.alive))
+        self.serial = any(self.strats[s] in needs_everyone for s in set(self.strat_ids[self.alive]))
+
+    def reset(self,slots):
+        '''new players in slots: forget their history'''
+        self._send(('reset',list(slots)))
+        self.lastplay[list(slots)] = -1
+
+    def play_round(self,t = 0):
+        '''every player plays every other once, in round t of generation gen. returns each player's points
+        for the round'''
+        points = numpy.zeros(self.numplayers)
+        key = (self.gen,t)
+        if not self.serial:
+            self._send(('round',self.numplayers,key))
+            for conn in self.conns:
+                points += conn.recv()
+            return points
+        for m in range(len(self.matchings)):
+            self._send(('matching',m,self.numplayers,self.lastplay,key))
+            for conn in self.conns:
+                won, players, moves = conn.recv()
+                points += won
+                self.lastplay[players] = moves
+        return points
+
+    def play_multiple_rounds(self,numrounds):
+        points = numpy.zeros(self.numplayers)
+        for t in range(numrounds):
+            points += self.play_round(t)
+        return points
+
+    def close(self):
+        self._send(('stop',))
+        for worker in self.workers:
+            worker.join()
+
+
+class ParallelRounds(object):
+    def __init__(self,strats,capacity,numworkers = None,seed = 0,streams = None):
+        '''playrounds on a ParallelRound over capacity slots, for population.evolve (play_population) or
+        pd.evolve2 (play_players). the history is in the workers, so births have to reach them: a
+        Population gets this as its history and calls reset for every birth, and play_players spots new
+        Player objects itself'''
+        self.strats = list(strats)
+        self.capacity = capacity
+        self.round = ParallelRound(self.strats,numpy.zeros(capacity,dtype=numpy.intp),numworkers,seed,streams,
+                                   numpy.zeros(capacity,dtype=bool))
+        ## slots born since the last call
+        self.born = set()
+        ## slot -> Player playing in it, for play_players
+        self.players = {}
+
+    def grow(self,size):
+        if size > self.capacity:
+            raise ValueError('the workers were set up for %d slots, not %d' % (self.capacity,size))
+
+    def reset(self,slot):
+        self.born.add(slot)
+
+    def _play(self,strat_ids,alive,numrounds):
+        if self.born:
+            self.round.reset(sorted(self.born))
+            self.born.clear()
+        self.round.set_strat_ids(strat_ids,alive)
+        points = self.round.play_multiple_rounds(numrounds)
+        self.round.gen += 1
+        return points
+
+    def play_population(self,pop,numrounds,rng = None):
+        '''playrounds for population.evolve. pop.strats has to be the strats this was made with'''
+        pop.points += self._play(pop.strat_ids,pop.alive,numrounds)
+
+    def play_players(self,numrounds,players = pd.playerlist):
+        '''playrounds for pd.evolve1/evolve2, strats being pd.strat_list'''
+        strat_ids = numpy.zeros(self.capacity,dtype=numpy.intp)
+        alive = numpy.zeros(self.capacity,dtype=bool)
+        which = dict((strat,s) for s, strat in enumerate(self.strats))
+        for player in players:
+            if self.players.get(player.index) is not player:
+                self.players[player.index] = player
+                self.born.add(player.index)
+            strat_ids[player.index] = which[player.strat]
+            alive[player.index] = True
+        points = self._play(strat_ids,alive,numrounds)
+        for player in players:
+            player.addpoints(points[player.index])
+
+    def population(self,num = pd.numplayers,strat = None):
+        '''a Population of num players all using strat (the first of strats by default) whose history is
+        this, like Population.from_strat'''
+        pop = Population(num,self.strats,history = self)
+        for i in range(num):
+            pop.add(0 if strat is None else self.strats.index(strat))
+        return pop
+
+    def close(self):
+        self.round.close()
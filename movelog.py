@@ -0,0 +1,133 @@
+import os
+
+import numpy
+
+import prisoners_dilemma as pd
+from vectorized import play_multiple_rounds_vectorized
+
+## the full record of every game, for when the few moves per pair in playhistory aren't enough. each game
+## is one fixed width record on disk, appended in batches, and the reader maps the file into memory as a
+## numpy record array, so looking at a column doesn't copy anything and the log can be far bigger than RAM.
+## i and j are history slots (Player.index), which get reused once a player dies
+##   with MoveLog('moves.log') as log:
+##       pd.evolve2(100,10,toPrint = False,playrounds = log.play_rounds)
+##   games = read('moves.log')
+##   gens, cooperation = cooperation_by_generation(games)
+
+DTYPE = numpy.dtype([('gen','<u4'),('round','<u4'),('i','<u4'),('j','<u4'),('move_i','u1'),('move_j','u1')])
+
+
+class MoveLog(object):
+    def __init__(self,path,batch = 1 << 16):
+        '''path = file to append to, batch = games to collect before writing them out'''
+        self.path = path
+        self.file = open(path,'ab')
+        self.buffer = numpy.zeros(batch,dtype=DTYPE)
+        self.pending = 0
+        ## generation the next playrounds call is for
+        self.gen = 0
+
+    def append(self,gen,round,i,j,move_i,move_j):
+        '''one game'''
+        if self.pending == len(self.buffer):
+            self.flush()
+        self.buffer[self.pending] = (gen,round,i,j,move_i,move_j)
+        self.pending += 1
+
+    def append_many(self,gen,round,i,j,move_i,move_j):
+        '''a lot of games at once, i, j, move_i and move_j being arrays'''
+        self.flush()
+        games = numpy.zeros(len(i),dtype=DTYPE)
+        games['gen'] = gen
+        games['round'] = round
+        games['i'] = i
+        games['j'] = j
+        games['move_i'] = move_i
+        games['move_j'] = move_j
+        games.tofile(self.file)
+
+    def flush(self):
+        if self.pending:
+            self.buffer[:self.pending].tofile(self.file)
+            self.pending = 0
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc):
+        self.close()
+
+    def play_rounds(self,numrounds):
+        '''drop in for pd.play_multiple_rounds that logs every game. plays exactly the same games'''
+        history = pd.playhistory
+        playerlist = pd.playerlist
+        for t in range(numrounds):
+            for a, b in pd.all_matches():
+                player1, player2 = playerlist[a], playerlist[b]
+                pd.play(player1,player2)
+                i, j = player1.index, player2.index
+                self.append(self.gen,t,i,j,history.last(i,j),history.last(j,i))
+        self.gen += 1
+
+    def play_rounds_vectorized(self,numrounds):
+        '''drop in for play_multiple_rounds_vectorized that logs every game'''
+        slots = numpy.array([player.index for player in pd.playerlist])
+        upper = numpy.triu_indices(len(slots),1)
+
+        def onround(t,moves):
+            self.append_many(self.gen,t,slots[upper[0]],slots[upper[1]],moves[upper],moves.T[upper])
+
+        play_multiple_rounds_vectorized(numrounds,onround = onround)
+        self.gen += 1
+
+
+def read(path):
+    '''the games logged in path as a read only record array mapped from the file. games['move_i'] and so
+    on are views, nothing is read until it's looked at. a game still being written is left out'''
+    size = os.path.getsize(path) // DTYPE.itemsize
+    if size == 0:
+        return numpy.zeros(0,dtype=DTYPE)
+    return numpy.memmap(path,dtype=DTYPE,mode='r',shape=(size,))
+
+def cooperation_by_generation(games,chunk = 1 << 22):
+    '''the generations in the log, in increasing order, and the fraction of moves in each that were
+    cooperation. the games needn't be in generation order, e.g. several runs appended to one log are
+    added up by generation. goes through the log a chunk at a time, so only a chunk's worth is ever in
+    memory'''
+    starts = range(0,len(games),chunk)
+    gens = numpy.unique(numpy.concatenate([numpy.zeros(0,dtype=DTYPE['gen'])] +
+                                          [numpy.unique(games['gen'][start:start + chunk]) for start in starts]))
+    moves = numpy.zeros(len(gens))
+    defections = numpy.zeros(len(gens))
+    for start in starts:
+        block = games[start:start + chunk]
+        found, which = numpy.unique(block['gen'],return_inverse=True)
+        ## position of each game's generation among all of them
+        where = numpy.searchsorted(gens,found)[which]
+        moves += 2 * numpy.bincount(where,minlength=len(gens))
+        defections += numpy.bincount(where,weights=block['move_i'],minlength=len(gens))
+        defections += numpy.bincount(where,weights=block['move_j'],minlength=len(gens))
+    return gens, 1 - defections / moves
+
+def pair_games(games,i,j,chunk = 1 << 22):
+    '''every game between slots i and j, in order, turned round where needed so i's moves are in move_i'''
+    found = [numpy.zeros(0,dtype=DTYPE)]
+    for start in range(0,len(games),chunk):
+        block = games[start:start + chunk]
+        backward = (block['i'] == j) & (block['j'] == i)
+        either = backward | ((block['i'] == i) & (block['j'] == j))
+        picked = block[either].copy()
+        swap = backward[either]
+        picked['i'][swap] = i
+        picked['j'][swap] = j
+        move_i = picked['move_i'].copy()
+        picked['move_i'][swap] = picked['move_j'][swap]
+        picked['move_j'][swap] = move_i[swap]
+        found.append(picked)
+    return numpy.concatenate(found)
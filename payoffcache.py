@@ -0,0 +1,198 @@
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+import types
+from collections import OrderedDict
+
+import numpy
+
+import markov
+import prisoners_dilemma as pd
+from registry import lookup
+
+## payoff numbers between pairs of strategies, kept on disk between runs. what a pair scores only changes
+## when one of the two strategies changes (its code, its kernel or the globals it reads, like
+## percentagedefect), when d, c or n change, or with the length of the match, so every entry is named
+## after a hash of exactly those. each entry is its own small json file, written under another name and
+## renamed like sweep.py's runs, so any number of processes can share a directory without locks: at worst
+## two of them work out the same pair and one rename wins. reading an entry touches it, and once the
+## directory is over maxbytes the least recently used files go first. the entries a process has seen are
+## kept in memory too, under the same limit.
+##   payoffs = expected_payoffs(pd.strat_list,10)       # markov.expected_payoffs, from disk when it can
+##   pd.evolve2(1000,10,playrounds = play_multiple_rounds_expected)
+
+## bump when the way the numbers are worked out changes (markov.py, cycles.py, the tournament), which
+## the hashes can't see
+VERSION = 2
+
+## next to this file rather than wherever a run is started from, so every run shares one
+DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)),'payoff_cache')
+
+## func -> hash of its source and the sources of the module functions it calls
+_sources = {}
+
+def _source_hash(func):
+    if func not in _sources:
+        digest = hashlib.sha1()
+        seen = set()
+        todo = [func]
+        while todo:
+            f = todo.pop()
+            if f in seen:
+                continue
+            seen.add(f)
+            digest.update(inspect.getsource(f))
+            ## helpers it calls, e.g. the kernels' streak, but only from its own module
+            for name in f.func_code.co_names:
+                helper = f.func_globals.get(name)
+                if isinstance(helper,types.FunctionType) and helper.__module__ == f.__module__:
+                    todo.append(helper)
+        _sources[func] = digest.hexdigest()
+    return _sources[func]
+
+def strategy_hash(strat):
+    '''hash of everything a strategy's play depends on: its function and kernel source and the current
+    values of its parameters'''
+    info = lookup(strat)
+    parts = [info.name,_source_hash(info.func),info.kernel and _source_hash(info.kernel),sorted(info.values().items())]
+    return hashlib.sha1(json.dumps(parts)).hexdigest()
+
+def pair_key(strat1,strat2,numrounds,kind = 'expected',**extra):
+    '''name of the entry for strat1 against strat2, and whether the pair is stored the other way round
+    (entries don't care about order, so (s, t) and (t, s) share one). extra = anything else the numbers
+    depend on, e.g. a tournament's precision'''
+    hash1, hash2 = strategy_hash(strat1),strategy_hash(strat2)
+    swapped = hash2 < hash1
+    if swapped:
+        hash1, hash2 = hash2,hash1
+    text = json.dumps({'version': VERSION,'kind': kind,'pair': [hash1,hash2],'payoffs': [pd.d,pd.c,pd.n],
+                       'numrounds': numrounds,'extra': extra},sort_keys = True)
+    return hashlib.sha1(text).hexdigest(), swapped
+
+
+class PayoffCache(object):
+    def __init__(self,directory = DIRECTORY,maxbytes = 64 << 20):
+        '''directory is made the first time something is stored. maxbytes = most the entries may take
+        up, on disk (checked every so often) and again in memory'''
+        self.directory = directory
+        self.maxbytes = maxbytes
+        ## entries this process has already read or written -> (value, size of its json), least recently
+        ## used first
+        self.memory = OrderedDict()
+        self.memory_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+
+    def _path(self,name):
+        return os.path.join(self.directory,name + '.json')
+
+    def _remember(self,name,value,size):
+        old = self.memory.pop(name,None)
+        if old is not None:
+            self.memory_bytes -= old[1]
+        self.memory[name] = value, size
+        self.memory_bytes += size
+        while self.memory_bytes > self.maxbytes:
+            value, size = self.memory.popitem(last = False)[1]
+            self.memory_bytes -= size
+
+    def get(self,name):
+        if name in self.memory:
+            ## put it back at the recent end
+            value, size = self.memory.pop(name)
+            self.memory[name] = value, size
+            self.hits += 1
+            return value
+        try:
+            with open(self._path(name)) as f:
+                text = f.read()
+            value = json.loads(text)
+            ## recently used, for eviction
+            os.utime(self._path(name),None)
+        except (IOError,OSError,ValueError):
+            ## not there, evicted under us, or somehow unreadable: work it out again
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._remember(name,value,len(text))
+        return value
+
+    def put(self,name,value):
+        if not os.path.isdir(self.directory):
+            try:
+                os.makedirs(self.directory)
+            except OSError:
+                ## another process made it first
+                pass
+        text = json.dumps(value)
+        fd, tmp = tempfile.mkstemp(dir = self.directory,suffix = '.tmp')
+        with os.fdopen(fd,'w') as f:
+            f.write(text)
+        os.rename(tmp,self._path(name))
+        self._remember(name,value,len(text))
+        self.stored += 1
+        if self.stored % 64 == 1:
+            self.evict()
+
+    def evict(self):
+        '''drop the least recently used entries until they fit in maxbytes'''
+        entries = []
+        for name in os.listdir(self.directory) if os.path.isdir(self.directory) else []:
+            if name.endswith('.json'):
+                try:
+                    info = os.stat(os.path.join(self.directory,name))
+                except OSError:
+                    continue
+                entries.append((info.st_mtime,info.st_size,name))
+        total = sum(size for mtime, size, name in entries)
+        for mtime, size, name in sorted(entries):
+            if total <= self.maxbytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory,name))
+                self.evicted += 1
+            except OSError:
+                ## somebody else evicted it
+                pass
+            total -= size
+
+    def stats(self):
+        return {'hits': self.hits,'misses': self.misses,'stored': self.stored,'evicted': self.evicted}
+
+cache = PayoffCache()
+
+
+def expected_payoffs(strats = pd.strat_list,numrounds = None,cache = cache):
+    '''markov.expected_payoffs, only working out the pairs that aren't in cache yet'''
+    strats = list(strats)
+    size = len(strats)
+    payoffs = numpy.zeros((size,size))
+    missing = {}
+    for a in range(size):
+        for b in range(a,size):
+            name, swapped = pair_key(strats[a],strats[b],numrounds)
+            value = cache.get(name)
+            if value is None:
+                missing[a,b] = name, swapped
+                continue
+            points = value['points'][::-1] if swapped else value['points']
+            payoffs[a,b], payoffs[b,a] = points
+    if missing:
+        ## only the strategies in a missing pair, in one go
+        which = sorted(set(s for pair in missing for s in pair))
+        fresh = markov.expected_payoffs([strats[s] for s in which],numrounds)
+        where = dict((s,x) for x, s in enumerate(which))
+        for (a, b), (name, swapped) in missing.items():
+            payoffs[a,b], payoffs[b,a] = fresh[where[a],where[b]],fresh[where[b],where[a]]
+            points = [payoffs[b,a],payoffs[a,b]] if swapped else [payoffs[a,b],payoffs[b,a]]
+            cache.put(name,{'points': [float(p) for p in points]})
+    return payoffs
+
+def play_multiple_rounds_expected(numrounds,players = pd.playerlist,cache = cache):
+    '''markov.play_multiple_rounds_expected with the payoffs from cache, so after the first generation
+    (or the first run) a generation costs no markov chains at all'''
+    markov.play_multiple_rounds_expected(numrounds,players,lambda strats, numrounds: expected_payoffs(strats,numrounds,cache))
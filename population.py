@@ -0,0 +1,141 @@
+import numpy
+
+import prisoners_dilemma as pd
+from history import PairHistory
+from topology import EdgeHistory
+from vectorized import play_block
+
+## the population as parallel arrays instead of a list of Player objects. slot i of every array is one
+## player (and slot i of the history). dead players' slots go on a free list and are handed to the next
+## births, so nothing ever has to be shifted down or searched for
+
+
+class Population(object):
+    def __init__(self,capacity,strats = pd.strat_list,history = None,edges = None):
+        '''capacity = number of slots to start with (more are added when needed)
+        strats = the strategies players can use, strat_ids index into it
+        history = per pair history, a PairHistory over the same slots by default
+        edges = the graph players play on (topology.py) instead of everyone: the history is then only kept
+        for those edges. [] for sampled opponents, whose history doesn't outlast a generation'''
+        self.strats = list(strats)
+        self.strat_ids = numpy.zeros(capacity,dtype=numpy.intp)
+        self.points = numpy.zeros(capacity)
+        self.alive = numpy.zeros(capacity,dtype=bool)
+        ## slots are handed out from the end of the list, lowest slot first
+        self.free = list(range(capacity - 1,-1,-1))
+        if history is None:
+            history = PairHistory(capacity) if edges is None else EdgeHistory(edges)
+        self.history = history
+
+    def __len__(self):
+        return len(self.alive) - len(self.free)
+
+    def _grow(self):
+        old = len(self.alive)
+        size = max(1,2 * old)
+        self.strat_ids = numpy.concatenate([self.strat_ids,numpy.zeros(size - old,dtype=numpy.intp)])
+        self.points = numpy.concatenate([self.points,numpy.zeros(size - old)])
+        self.alive = numpy.concatenate([self.alive,numpy.zeros(size - old,dtype=bool)])
+        self.free.extend(range(size - 1,old - 1,-1))
+        self.history.grow(size)
+
+    def add(self,strat_id):
+        '''a new player using strats[strat_id], with no points and no history. returns its slot'''
+        if not self.free:
+            self._grow()
+        slot = self.free.pop()
+        self.strat_ids[slot] = strat_id
+        self.points[slot] = 0
+        self.alive[slot] = True
+        self.history.reset(slot)
+        return slot
+
+    def remove(self,slot):
+        self.alive[slot] = False
+        self.free.append(slot)
+
+    def slots(self):
+        '''slots of everyone alive, in increasing order'''
+        return numpy.flatnonzero(self.alive)
+
+    def lowest(self,k):
+        '''slots of the k lowest scorers, in no particular order. ties are broken arbitrarily'''
+        slots = self.slots()
+        if k >= len(slots):
+            return slots
+        return slots[numpy.argpartition(self.points[slots],k)[:k]]
+
+    def highest(self,k):
+        '''slots of the k highest scorers, in no particular order'''
+        slots = self.slots()
+        if k >= len(slots):
+            return slots
+        return slots[numpy.argpartition(-self.points[slots],k)[:k]]
+
+    def endgen(self):
+        self.points[:] = 0
+
+    def counts(self):
+        '''counts[s] = how many players are using strats[s]'''
+        return numpy.bincount(self.strat_ids[self.alive],minlength=len(self.strats))
+
+    def play_rounds(self,numrounds,rng = numpy.random):
+        '''everyone alive plays everyone else numrounds times, with the vectorized engine'''
+        slots = self.slots()
+        self.points[slots] += play_block([self.strats[s] for s in self.strat_ids[slots]],self.history,slots,numrounds,rng)
+
+    @classmethod
+    def from_strat(cls,strat,num = pd.numplayers,strats = pd.strat_list,history = None,edges = None):
+        '''num players all using strat, like pd.new_population. history and edges as for Population'''
+        pop = cls(num,strats,history,edges)
+        for i in range(num):
+            pop.add(pop.strats.index(strat))
+        return pop
+
+
+def generation_record(pop,gen,mutations,deaths):
+    '''pd.generation_record for a Population'''
+    slots = pop.slots()
+    points = pop.points[slots]
+    counts = pop.counts()
+    return {'gen': gen,'counts': dict((pop.strats[s].__name__,int(counts[s])) for s in numpy.flatnonzero(counts)),
+            'mean': float(points.mean()),'min': float(points.min()),'max': float(points.max()),
+            'mutations': mutations,'deaths': deaths}
+
+def evolve(pop,numgens,numyears_pergen,rng = numpy.random,playrounds = Population.play_rounds,record = None,every = 1):
+    '''evolution on a Population: each generation every player mutates with probability
+    mutation_parameter, everybody plays, and the cruel_selection lowest scorers are replaced by copies of
+    the same number of top scorers. selection is a partial sort, so a generation costs O(N) on top of the
+    games instead of a full sort.
+    not quite pd.evolve2, whose playerlist[-j] has every child copy the lowest scorer left after the
+    first death, nor dynamics.evolve_counts, where they all copy the best strategy
+    playrounds(pop, numrounds, rng) plays the games, everyone against everyone by default (see topology.py)
+    record, every = as in pd.evolve1'''
+    profiler = pd.profiler
+    for i in range(numgens):
+        with profiler.phase('mutation'):
+            slots = pop.slots()
+            mutants = slots[rng.random_sample(len(slots)) < pd.mutation_parameter]
+            pop.strat_ids[mutants] = rng.randint(len(pop.strats),size=len(mutants))
+        with profiler.phase('play'):
+            playrounds(pop,numyears_pergen,rng)
+        if record is not None and i % every == 0:
+            record(generation_record(pop,i,len(mutants),pd.cruel_selection))
+        with profiler.phase('selection'):
+            losers = pop.lowest(pd.cruel_selection)
+            winners = pop.strat_ids[pop.highest(pd.cruel_selection)]
+            for slot in losers:
+                pop.remove(slot)
+        with profiler.phase('reproduction'):
+            for strat_id in winners:
+                pop.add(strat_id)
+        with profiler.phase('reset'):
+            pop.endgen()
+        profiler.endgen()
+    ## play one more generation without replacing
+    playrounds(pop,numyears_pergen,rng)
+    if record is not None:
+        record(generation_record(pop,numgens,0,pd.cruel_selection))
+    for slot in pop.lowest(pd.cruel_selection):
+        pop.remove(slot)
+    return pop
@@ -1,15 +1,27 @@
+import argparse
+import math
 import random
 
+import numpy
+
+from history import PairHistory, COOPERATE, DEFECT
+
 ## prisoner's dilemma game, with evolution and selection
 ## if executed without modification, instantiates 20 players who mostly defect, but the population can 
 ## be invaded by the other strategies over the 1000 'generations' iterated in the function 'evolve2'
 ## prints out initial strategies and strategies of the 15 survivors at the end
+## importing it doesn't run anything: call run(), or run it from the command line (see main)
 
 
 ## global list of players. i've been warned against using global variables, but seemed like the best way
 playerlist = []
+## history slots of players that have died, for new players to reuse
+freeslots = []
 
 numplayers = 20
+## every move made, stored compactly by player index (see history.py). strategies read it instead of
+## keeping their own lists of plays
+playhistory = PairHistory(numplayers)
 ## variables to be used in stochastic strategies
 percentagecooperate = 0.7
 percentagedefect = 0.9
@@ -20,6 +32,21 @@ mutation_parameter = 0.02
 simplesimulation = False
 evolution = True
 
+class _NoProfiler(object):
+    '''stands in for profiling.Profiler while profiling is off, so the phases in evolve1 and evolve2 cost
+    nothing to speak of'''
+    def phase(self,name):
+        return self
+    def __enter__(self):
+        pass
+    def __exit__(self,*exc):
+        pass
+    def endgen(self,count = 1):
+        pass
+
+## where evolve1 and evolve2 report their phases to, see profiling.py
+profiler = _NoProfiler()
+
 ## prisoner's dilemma parameters
 ##defect payoff if opp cooperateerates
 d = 7
@@ -31,7 +58,7 @@ n = 1
 ## strategies 
 def mostlyrandomplay(player1,player2):
     ## check if last three plays by the opponent against you were defect
-    if player2.plays[player1.index][-3:] == ['defect','defect','defect']:
+    if playhistory.streak(player2.index,player1.index,3,DEFECT):
         return 'defect'
     else:
         l = ['cooperate','defect']
@@ -42,10 +69,10 @@ def always_cooperate(player1,player2):
     
 def clever(player1,player2):
     ## check if last two plays were cooperate. if so, take advantage!
-    if player2.plays[player1.index][-2:] == ['cooperate','cooperate']:
+    if playhistory.streak(player2.index,player1.index,2,COOPERATE):
         return 'defect'
     ## if opponent appears to be a defector, don't cooperate
-    elif player2.plays[player1.index][-2:] == ['defect','defect']:
+    elif playhistory.streak(player2.index,player1.index,2,DEFECT):
         return 'defect'
     else:
         return 'cooperate'
@@ -63,45 +90,45 @@ def mostly_defect(player1,player2):
 def tit_for_tat_1(player1,player2):
     '''smart tit for tat, can see player's last move against any opponent'''
     ## not using this strategy in simulation below
-    if len(player2.allplays) == 0:
+    if playhistory.lastmove(player2.index) == -1:
         return 'cooperate'
-    elif player2.allplays[-1] == 'cooperate':
+    elif playhistory.lastmove(player2.index) == COOPERATE:
         return 'cooperate'
-    elif player2.allplays[-1] == 'defect':
+    elif playhistory.lastmove(player2.index) == DEFECT:
         return 'defect'
     else:
         raise 'second player index error, t for t 1'
 
 def tit_for_tat_2(player1,player2):
     '''traditional tit for tat, plays whatever opponent last played against you'''
-    if player2.plays[player1.index] == []:
+    if playhistory.played(player2.index,player1.index) == 0:
         return 'cooperate'
-    elif player2.plays[player1.index][-1] == 'cooperate':
+    elif playhistory.last(player2.index,player1.index) == COOPERATE:
         return 'cooperate'
-    elif player2.plays[player1.index][-1] == 'defect':
+    elif playhistory.last(player2.index,player1.index) == DEFECT:
         return 'defect'
 
         
 def tit_for_tat_opp(player1,player2):
     '''opposite of tit for tat, with exceptions'''
     ## initial play
-    if player2.plays[player1.index] == []:
+    if playhistory.played(player2.index,player1.index) == 0:
         l = ['cooperate','defect']
         play = random.choice(l)
         return play
     ## if opponent is a serial defector, don't cooperate
-    elif player2.plays[player1.index][-2:] == ['defect','defect']:
+    elif playhistory.streak(player2.index,player1.index,2,DEFECT):
         return 'defect'
     ## otherwise, do the opposite of tit for tat
-    elif player2.plays[player1.index][-1] == 'cooperate':
+    elif playhistory.last(player2.index,player1.index) == COOPERATE:
         return 'defect'
-    elif player2.plays[player1.index][-1] == 'defect':
+    elif playhistory.last(player2.index,player1.index) == DEFECT:
         return 'cooperate'
     
 
 def mostly_cooperate(player1,player2):
     ## check for serial defector
-    if player2.plays[player1.index][-3:] == ['defect','defect','defect']:
+    if playhistory.streak(player2.index,player1.index,3,DEFECT):
         return 'defect'
     ## otherwise, cooperate stochastically
     elif random.random() <  percentagecooperate:
@@ -117,19 +144,19 @@ def mostly_tit_for_tat(player1,player2):
         
 def tit_for_two_tat(player1,player2):
     '''more forgiving'''
-    if len(player2.plays[player1.index]) <= 1:
+    if playhistory.played(player2.index,player1.index) <= 1:
         return 'cooperate'
-    elif player2.plays[player1.index][-2:] == ['defect','defect']:
+    elif playhistory.streak(player2.index,player1.index,2,DEFECT):
         return 'defect'
     else:
         return 'cooperate'
         
 def tit_for_tat_forgiving(player1,player2):
-    if player2.plays[player1.index] == []:
+    if playhistory.played(player2.index,player1.index) == 0:
         return 'cooperate'
-    elif player2.plays[player1.index][-1] == 'cooperate':
+    elif playhistory.last(player2.index,player1.index) == COOPERATE:
         return 'cooperate'
-    elif player2.plays[player1.index][-1] == 'defect':
+    elif playhistory.last(player2.index,player1.index) == DEFECT:
         if random.random() < tit_for_tat_param:
             return 'cooperate'
         else:
@@ -147,28 +174,24 @@ strat_list = [mostly_tit_for_tat,mostly_cooperate,tit_for_tat_opp,tit_for_tat_2,
 ## player class defined in file classes
 
 class Player(object):
-    def __init__(self,name,strat,points = 0, plays = None, allplays = None):
+    def __init__(self,name,strat,points = 0):
         '''points: stores points accrued in a single generation or set of games
         strat = strategy, defined above
-        plays =  list of lists storing plays made against each opponent
-        allplays = list of all plays made: this might be unnecessary'''
+        plays made are kept in the global playhistory, under the player's index'''
         self.name = name
         self.strat = strat
         self.points = points
-        if plays == None:
-            self.plays = []
-            for i in range(numplayers):
-                self.plays.append([])
-        else:
-            self.plays = plays
-        if allplays == None:
-            self.allplays = []
-        else:
-            self.allplays = allplays
-        ## playerlist gets modified when a player is instantiated, and the correct index is assigned to the player
+        ## playerlist gets modified when a player is instantiated, and the player gets a history slot: a dead
+        ## player's if there is one, otherwise the next one up (every lower slot is taken then)
         global playerlist
         playerlist.append(self)
-        self.index = playerlist.index(self)
+        if freeslots:
+            self.index = freeslots.pop()
+        else:
+            self.index = len(playerlist) - 1
+        ## a new player starts with a clean record
+        playhistory.grow(self.index + 1)
+        playhistory.reset(self.index)
         self.nextplay = None
     def addpoints(self,points):
         self.points += points
@@ -179,8 +202,7 @@ class Player(object):
         return play
     def makeplay(self,opp):
         play = self.nextplay
-        self.allplays.append(play)
-        self.plays[opp.index].append(play)
+        playhistory.record(self.index,opp.index,DEFECT if play == 'defect' else COOPERATE)
         return play
     def __lt__(self,other):
         return self.points < other.points
@@ -200,20 +222,16 @@ def play(player1,player2, toPrint1 = False, toPrint2 = False):
         print 'player '+str(player1.__str__())+' vs '+str(player2.__str__())
         print 'player1 points before playing ', player1.points
         print 'player2 points before playing ', player2.points
-        if len(player1.allplays) >= numplayers - 1:
-            print 'last matchup between the players', player1.plays[player2.index][-1],player2.plays[player1.index][-1]
+        if playhistory.played(player1.index,player2.index) > 0:
+            print 'last matchup between the players', playhistory.moves(player1.index,player2.index)[-1],playhistory.moves(player2.index,player1.index)[-1]
         
     if player1 == player2:
         return None
     
     if toPrint1:
         
-        print 'player '+player1.__str__()+'all plays=', player1.allplays
-        print 'player '+player1.__str__()+'plays', player1.plays
-        print 'player '+player1.__str__()+'plays against opp', player1.plays[player2.index]
-        print 'player '+player2.__str__()+'all plays=', player2.allplays
-        print 'player '+player2.__str__()+'plays', player2.plays
-        print 'player '+player2.__str__()+'plays against opp', player2.plays[player1.index]
+        print 'player '+player1.__str__()+'plays against opp', playhistory.moves(player1.index,player2.index)
+        print 'player '+player2.__str__()+'plays against opp', playhistory.moves(player2.index,player1.index)
     ## play below
     player1.decideplay(player2)
     player2.decideplay(player1)
@@ -241,43 +259,39 @@ def play(player1,player2, toPrint1 = False, toPrint2 = False):
 
 
 ## define some players for a simple simulation
-if simplesimulation:
-    player1 = Player(1,tit_for_tat_2)
-    player2 = Player('titfortat2',tit_for_tat_2)
-    player3 = Player('defect',mostly_defect)
-    player4 = Player('clever',clever)
-    player5 = Player('mostly random',mostlyrandomplay)
-    player6 = Player('titfortat opp',tit_for_tat_opp)
-    player7 = Player('mostly cooperate',mostly_cooperate)
-    player8 = Player('mostly titfortat',mostly_tit_for_tat)
-
+def simple_simulation():
+    del playerlist[:]
+    del freeslots[:]
+    Player(1,tit_for_tat_2)
+    Player('titfortat2',tit_for_tat_2)
+    Player('defect',mostly_defect)
+    Player('clever',clever)
+    Player('mostly random',mostlyrandomplay)
+    Player('titfortat opp',tit_for_tat_opp)
+    Player('mostly cooperate',mostly_cooperate)
+    Player('mostly titfortat',mostly_tit_for_tat)
+    return playerlist
+
+
+def new_population(strat,num = numplayers):
+    '''throw away the current players and their history, and start again with num players using strat'''
+    del playerlist[:]
+    del freeslots[:]
+    for i in range(num):
+        Player(i,strat)
 
 ## for the evolution scenario
 ## some strategies impossible to invade, surprisingly, like tit for tat opposite
-if evolution:
-    ## modify the initial strategy to see which strategies are prone to invasion, or make it random
-    initial_strat = mostly_defect
-    for i in range(numplayers):
-        Player(i,initial_strat)
-    ## comment out below for long simulations
-    print '####### INITIAL PLAYERS ##########'
-    for player in playerlist:
-        print player.strat
-
-## below, randomizing the order of the individual games in a round        
-playerorder = range(numplayers)
-
-## make a new list that's identical to playerlist, but that we can modify without modifying global playerlist
-for i in range(numplayers):
-    playerorder[i] = playerlist[playerorder[i]]
+## modify the initial strategy to see which strategies are prone to invasion, or make it random
+initial_strat = mostly_defect
 
 
 def all_matches():
     '''list of all matchups in a single round (that is, every player plays every other player once), numteams+1 choose 2 games'''
     list_tups = []
     # print numplayers  
-    for j in range(numplayers):
-        for i in range(j+1,numplayers):
+    for j in range(len(playerlist)):
+        for i in range(j+1,len(playerlist)):
             list_tups.append((i,j))
             
     random.shuffle(list_tups)
@@ -302,12 +316,15 @@ def play_multiple_rounds(numrounds):
     
     
 def play_each_other(numrounds):
+    ## below, randomizing the order of the individual games in a round
+    ## make a new list that's identical to playerlist, but that we can modify without modifying global playerlist
+    playerorder = list(playerlist)
     for t in range(numrounds):
         random.shuffle(playerorder)
        
         
-        for j in range(numplayers):
-            for i in range(j+1,numplayers):
+        for j in range(len(playerorder)):
+            for i in range(j+1,len(playerorder)):
                 play(playerorder[i],playerorder[j])
 
 def order_players(players = playerlist):
@@ -316,60 +333,183 @@ def order_players(players = playerlist):
 ## one more parameter to decide how many players 'die' after each full round (or 'generation')
 cruel_selection = 3
 
-def evolve1(numgens,numyears_pergen):
+def generation_record(gen,mutations,deaths,players = playerlist):
+    '''a compact summary of generation gen for watching a run as it goes (see streaming.py): how many
+    players use each strategy and their points, taken after the games and before anyone dies'''
+    counts = {}
+    for player in players:
+        name = player.strat.__name__
+        counts[name] = counts.get(name,0) + 1
+    points = [player.points for player in players]
+    return {'gen': gen,'counts': counts,'mean': sum(points) / float(len(points)),'min': min(points),
+            'max': max(points),'mutations': mutations,'deaths': deaths}
+
+def evolve1(numgens,numyears_pergen,playrounds = play_multiple_rounds,record = None,every = 1):
     '''numgens = int, number of iterations
-    numyears_pergen = int, number of times each team will 'play' before the selection happens'''
+    numyears_pergen = int, number of times each team will 'play' before the selection happens
+    playrounds = function that plays numyears_pergen rounds among playerlist, e.g. the vectorized or
+    expected-payoff versions in vectorized.py and markov.py
+    record = function called with generation_record for every every'th generation, and the last'''
     ## new team gets new name
     playernum = numplayers + 1
     for i in range(numgens):
-        play_multiple_rounds(numyears_pergen)
-        order_players()
+        with profiler.phase('play'):
+            playrounds(numyears_pergen)
+        if record is not None and i % every == 0:
+            record(generation_record(i,0,cruel_selection))
+        with profiler.phase('sort'):
+            order_players()
         for j in range(cruel_selection):
             ## kill off the losers
-            playerlist.pop(0)
+            with profiler.phase('selection'):
+                freeslots.append(playerlist.pop(0).index)
             ## insert randoms
-            newstrat = random.choice(strat_list)
-            Player(i,newstrat)
+            with profiler.phase('reproduction'):
+                newstrat = random.choice(strat_list)
+                Player(i,newstrat)
             # print 'new strategy ', newstrat
-        for player in playerlist:
-            player.endgen()
+        with profiler.phase('reset'):
+            for player in playerlist:
+                player.endgen()
+        profiler.endgen()
     ## play one more generation without replacing
-    play_multiple_rounds(numyears_pergen)
+    playrounds(numyears_pergen)
+    if record is not None:
+        record(generation_record(numgens,0,cruel_selection))
     order_players()
     for j in range(cruel_selection):
-        playerlist.pop(0)
+        freeslots.append(playerlist.pop(0).index)
     for player in playerlist:
         print player.strat
  
+## once everybody uses the same strategy, generations go by with nothing changing until a mutation
+## brings in a different one. evolve2's fastforward jumps straight to that generation: how many
+## generations pass first is geometric, and the generation it happens in is one with at least one
+## mutation to a different strategy
+def _monomorphic():
+    strat = playerlist[0].strat
+    for player in playerlist:
+        if player.strat is not strat:
+            return False
+    return True
+
+def _plateau_length(remaining):
+    '''how many generations, up to remaining, go by before one with a mutation to another strategy'''
+    resident = playerlist[0].strat
+    others = sum(1 for strat in strat_list if strat is not resident)
+    change = mutation_parameter * others / float(len(strat_list))
+    if change <= 0:
+        return remaining
+    if change >= 1:
+        return 0
+    nothing = len(playerlist) * math.log(1 - change)
+    return min(remaining,int(math.log(1 - random.random()) / nothing))
+
+def _mutate_after_plateau():
+    '''the mutations of a generation with at least one mutation to another strategy. the first player to
+    change is drawn directly, the ones after it mutate as usual. returns the number of mutations'''
+    resident = playerlist[0].strat
+    others = [strat for strat in strat_list if strat is not resident]
+    change = mutation_parameter * len(others) / float(len(strat_list))
+    num = len(playerlist)
+    if change >= 1:
+        first = 0
+    else:
+        ## geometric, cut off at the last player
+        first = min(num - 1,int(math.log(1 - random.random() * (1 - (1 - change) ** num)) / math.log(1 - change)))
+    playerlist[first].strat = random.choice(others)
+    mutations = 1
+    for t in range(first + 1,num):
+        if random.random() < mutation_parameter:
+            playerlist[t].strat = random.choice(strat_list)
+            mutations += 1
+    return mutations
+
+def _plateau_record(gen):
+    '''record for a generation fastforward skipped: everybody still uses the resident strategy, and no
+    games were played so there are no points'''
+    skipped = generation_record(gen,0,cruel_selection)
+    skipped.update(mean = None,min = None,max = None,skipped = True)
+    return skipped
+
 ## incredibly variable results!!        
-def evolve2(numgens,numyears_pergen):
+def evolve2(numgens,numyears_pergen,toPrint = True,playrounds = play_multiple_rounds,record = None,every = 1,
+            start = 0,checkpoint = None,fastforward = False):
     '''boots out the losing players, replicates the winning players instead of random ones,
      and mutates each player with a fixed probability
-     uncomment print statements to see it in action'''
+     uncomment print statements to see it in action
+     toPrint = print the survivors' strategies at the end
+     playrounds = function that plays the rounds of a generation, as in evolve1
+     record, every = as in evolve1
+     start = generations already done, for carrying on a run from a checkpoint
+     checkpoint = function called with the number of generations done after each one (see checkpoint.py)
+     fastforward = skip the generations where everybody uses the same deterministic strategy and nothing
+     mutates. which strategies are around when goes the same way as without it, but the skipped games
+     aren't played, so their points and history don't happen. records for them have the population as it
+     is and no points. a resident that flips coins is played out as usual'''
     playernum = numplayers + 1
-    for i in range(numgens):
-        for t in range(len(playerlist)):
-            if random.random() < mutation_parameter:
-                playerlist[t].strat = random.choice(strat_list)
-                # print 'mutation!!!!'
-                # print 'new strategy= ', playerlist[t].strat
-        play_multiple_rounds(numyears_pergen)
-        order_players()
+    if fastforward:
+        ## the registry imports this module
+        from registry import deterministic
+        settled = deterministic()
+    i = start
+    while i < numgens:
+        if fastforward and _monomorphic() and playerlist[0].strat in settled:
+            with profiler.phase('fastforward'):
+                skipped = _plateau_length(numgens - i)
+                if record is not None:
+                    for gen in range(i + -i % every,i + skipped,every):
+                        record(_plateau_record(gen))
+            profiler.endgen(skipped)
+            i += skipped
+            if i == numgens:
+                ## a checkpoint any earlier would be taken before _mutate_after_plateau, and resuming from it
+                ## would draw the plateau again instead of mutating
+                if skipped and checkpoint is not None:
+                    checkpoint(i)
+                break
+            with profiler.phase('mutation'):
+                mutations = _mutate_after_plateau()
+        else:
+            mutations = 0
+            with profiler.phase('mutation'):
+                for t in range(len(playerlist)):
+                    if random.random() < mutation_parameter:
+                        playerlist[t].strat = random.choice(strat_list)
+                        mutations += 1
+                        # print 'mutation!!!!'
+                        # print 'new strategy= ', playerlist[t].strat
+        with profiler.phase('play'):
+            playrounds(numyears_pergen)
+        if record is not None and i % every == 0:
+            record(generation_record(i,mutations,cruel_selection))
+        with profiler.phase('sort'):
+            order_players()
         for j in range(cruel_selection):
-            playerlist.pop(0)
-            newstrat = playerlist[-j].strat
-            Player(i,newstrat)
+            with profiler.phase('selection'):
+                freeslots.append(playerlist.pop(0).index)
+            with profiler.phase('reproduction'):
+                newstrat = playerlist[-j].strat
+                Player(i,newstrat)
             # print 'new strategy = winning strategy =  ', newstrat
-        for player in playerlist:
-            player.endgen()
+        with profiler.phase('reset'):
+            for player in playerlist:
+                player.endgen()
+        profiler.endgen()
+        i += 1
+        if checkpoint is not None:
+            checkpoint(i)
     ## play one more generation without replacing
-    play_multiple_rounds(numyears_pergen)
+    playrounds(numyears_pergen)
+    if record is not None:
+        record(generation_record(numgens,0,cruel_selection))
     order_players()
     for j in range(cruel_selection):
-        playerlist.pop(0)
-    print '#### FINAL SURVIVORS ########'
-    for player in playerlist:
-        print player.strat
+        freeslots.append(playerlist.pop(0).index)
+    if toPrint:
+        print '#### FINAL SURVIVORS ########'
+        for player in playerlist:
+            print player.strat
         
 # def evolve3(numgens,numyears_pergen):
     
@@ -377,8 +517,84 @@ def evolve2(numgens,numyears_pergen):
         
 ## these results are kinda crazy. different each time. next step: run many versions of evolve2 and collect
 ## results in a histogram, find out distribution of results/ strategies that do well more often, etc.
-      
-evolve2(1000,10)
+## (ensemble.py does that now)
+
+def run(numgens = 1000,numyears_pergen = 10,strat = None,num = None,toPrint = True,record = None,every = 1,
+        fastforward = False):
+    '''the evolution scenario: num players (numplayers by default) all start out using strat (initial_strat
+    by default) and evolve2 runs for numgens generations, passing it record, every and fastforward. returns
+    the survivors'''
+    if strat is None:
+        strat = initial_strat
+    if num is None:
+        num = numplayers
+    new_population(strat,num)
+    ## comment out below for long simulations
+    if toPrint:
+        print '####### INITIAL PLAYERS ##########'
+        for player in playerlist:
+            print player.strat
+    evolve2(numgens,numyears_pergen,toPrint,record = record,every = every,fastforward = fastforward)
+    return playerlist
+
+def main(argv = None):
+    '''command line version of run. the payoffs and strategies given replace the module globals'''
+    global numplayers, strat_list, d, c, n
+    parser = argparse.ArgumentParser(description = "prisoner's dilemma with evolution and selection")
+    parser.add_argument('--players',type = int,default = numplayers,help = 'population size')
+    parser.add_argument('--strategies',nargs = '+',help = 'names of the strategies mutations can pick, all of strat_list by default')
+    parser.add_argument('--initial',default = initial_strat.__name__,help = 'strategy everyone starts with')
+    parser.add_argument('-d',type = float,default = d,help = 'payoff for defecting against a cooperator')
+    parser.add_argument('-c',type = float,default = c,help = 'payoff when both cooperate')
+    parser.add_argument('-n',type = float,default = n,help = 'payoff when both defect')
+    parser.add_argument('--generations',type = int,default = 1000)
+    parser.add_argument('--years',type = int,default = 10,help = 'rounds played per generation')
+    parser.add_argument('--seed',type = int,help = 'seed for the random numbers, for a repeatable run')
+    parser.add_argument('--simple',action = 'store_true',help = 'play a few rounds among a fixed set of players instead')
+    parser.add_argument('--profile',action = 'store_true',help = 'print where the time went at the end')
+    parser.add_argument('--record',help = 'file to append a line of statistics per generation to, as it runs')
+    parser.add_argument('--every',type = int,default = 1,help = 'record every this many generations')
+    parser.add_argument('--fastforward',action = 'store_true',help = 'skip generations where everybody uses the same deterministic strategy and nothing mutates')
+    args = parser.parse_args(argv)
+    ## the registry imports this module, so only bring it in once we're running
+    from registry import by_name, lookup
+    try:
+        strats = by_name(args.strategies) if args.strategies else None
+        initial = lookup(args.initial).func
+    except KeyError as e:
+        ## the message lists the names there are
+        parser.error(e.args[0])
+    numplayers = args.players
+    d, c, n = args.d, args.c, args.n
+    if strats:
+        strat_list = strats
+    if args.seed is not None:
+        random.seed(args.seed)
+        numpy.random.seed(args.seed)
+    if args.profile:
+        import profiling
+        profiling.enable()
+    if args.simple or simplesimulation:
+        simple_simulation()
+        play_multiple_rounds(args.years)
+        for player in playerlist:
+            print str(player.__str__()) + '\'s'+'points=' + str(player.points) + '   ',str(player.strat)
+    elif evolution:
+        if args.record:
+            from streaming import JsonlSink
+            with JsonlSink(args.record) as sink:
+                run(args.generations,args.years,initial,record = sink,every = args.every,
+                    fastforward = args.fastforward)
+        else:
+            run(args.generations,args.years,initial,fastforward = args.fastforward)
+    if args.profile:
+        profiling.print_report(profiling.disable().report())
+
+if __name__ == '__main__':
+    ## run main from the imported module rather than __main__, so the players and strategies here are the
+    ## same objects the other modules (registry and so on) see
+    import prisoners_dilemma
+    prisoners_dilemma.main()
         
   
       
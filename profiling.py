@@ -0,0 +1,146 @@
+from collections import defaultdict
+from timeit import default_timer as timer
+
+import prisoners_dilemma as pd
+
+## where the time goes in a run: evolve1 and evolve2 mark their phases (mutation, play, sort, selection,
+## reproduction, reset) on pd.profiler, which does nothing until enable() swaps in a Profiler. enable()
+## also swaps timed versions of play(), Player.decideplay and Player.makeplay into prisoners_dilemma, so
+## every strategy's decisions get counted and timed. disable() puts the originals back, so a run that
+## isn't being profiled runs exactly the code it always did
+##   profiler = profiling.enable()
+##   pd.run(100)
+##   profiling.disable()
+##   profiling.print_report(profiler.report())
+
+
+class Profiler(object):
+    def __init__(self,every = None,callback = None):
+        '''every = take a report every this many generations, callback(report) gets them. without a
+        callback they're kept in samples'''
+        self.every = every
+        self.callback = callback
+        self.samples = []
+        self.reset()
+
+    def reset(self):
+        ## phase -> [times entered, seconds spent]
+        self.phases = defaultdict(lambda: [0,0.0])
+        ## strategy function -> [decisions, seconds spent deciding]
+        self.strats = defaultdict(lambda: [0,0.0])
+        ## inside play(): games, time in play() altogether, and in makeplay (recording the moves)
+        self.games = 0
+        self.game_time = 0.0
+        self.record_time = 0.0
+        self.generations = 0
+        self._current = []
+
+    def phase(self,name):
+        self._current.append(name)
+        return self
+
+    def __enter__(self):
+        self._current[-1] = (self._current[-1],timer())
+
+    def __exit__(self,*exc):
+        name, start = self._current.pop()
+        phase = self.phases[name]
+        phase[0] += 1
+        phase[1] += timer() - start
+
+    def endgen(self,count = 1):
+        '''count = generations that went by, more than one when evolve2's fastforward skips some. a skip past
+        several sampling points gives one report'''
+        before = self.generations
+        self.generations += count
+        if self.every and self.generations // self.every > before // self.every:
+            report = self.report()
+            if self.callback is None:
+                self.samples.append(report)
+            else:
+                self.callback(report)
+
+    def report(self):
+        '''what's been measured so far, as nested dicts of plain numbers'''
+        total = sum(seconds for count, seconds in self.phases.values()) or 1.0
+        decide_time = sum(seconds for count, seconds in self.strats.values())
+        return {'generations': self.generations,
+                'phases': dict((name,{'calls': count,'seconds': seconds,'share': seconds / total})
+                               for name, (count, seconds) in self.phases.items()),
+                'strategies': dict((strat.__name__,{'calls': count,'seconds': seconds,
+                                                    'us_per_call': 1e6 * seconds / count})
+                                   for strat, (count, seconds) in self.strats.items()),
+                ## whatever play() spends outside deciding and recording is the payoff bookkeeping
+                'games': {'calls': self.games,'seconds': self.game_time,'deciding': decide_time,
+                          'recording': self.record_time,
+                          'payoffs': max(0.0,self.game_time - decide_time - self.record_time)}}
+
+
+_originals = {}
+_active = None
+
+def enable(profiler = None):
+    '''start profiling with profiler, a new Profiler by default. returns it'''
+    global _active
+    if _active is not None:
+        disable()
+    _active = profiler or Profiler()
+    strats = _active.strats
+    ## the plain functions from the class dict, not the unbound methods getattr gives, so disable puts
+    ## back exactly what was there
+    decideplay = pd.Player.__dict__['decideplay']
+    makeplay = pd.Player.__dict__['makeplay']
+    play = pd.play
+
+    def timed_decideplay(self,opp):
+        start = timer()
+        move = decideplay(self,opp)
+        entry = strats[self.strat]
+        entry[0] += 1
+        entry[1] += timer() - start
+        return move
+
+    def timed_makeplay(self,opp):
+        start = timer()
+        move = makeplay(self,opp)
+        _active.record_time += timer() - start
+        return move
+
+    def timed_play(player1,player2,toPrint1 = False,toPrint2 = False):
+        start = timer()
+        result = play(player1,player2,toPrint1,toPrint2)
+        _active.games += 1
+        _active.game_time += timer() - start
+        return result
+
+    _originals.update(decideplay = decideplay,makeplay = makeplay,play = play)
+    pd.Player.decideplay = timed_decideplay
+    pd.Player.makeplay = timed_makeplay
+    pd.play = timed_play
+    pd.profiler = _active
+    return _active
+
+def disable():
+    '''stop profiling and put prisoners_dilemma back as it was. returns the profiler that was running'''
+    global _active
+    profiler, _active = _active, None
+    if _originals:
+        pd.Player.decideplay = _originals.pop('decideplay')
+        pd.Player.makeplay = _originals.pop('makeplay')
+        pd.play = _originals.pop('play')
+    pd.profiler = pd._NoProfiler()
+    return profiler
+
+
+def print_report(report):
+    print 'generations: %d' % report['generations']
+    print '%-14s %10s %10s %7s' % ('phase','calls','seconds','share')
+    for name, phase in sorted(report['phases'].items(),key = lambda item: -item[1]['seconds']):
+        print '%-14s %10d %10.3f %6.1f%%' % (name,phase['calls'],phase['seconds'],100 * phase['share'])
+    games = report['games']
+    if games['calls']:
+        print 'play(): %d games in %.3fs, deciding %.3fs, recording moves %.3fs, payoffs %.3fs' % (
+            games['calls'],games['seconds'],games['deciding'],games['recording'],games['payoffs'])
+    print '%-22s %10s %10s %10s' % ('strategy','decisions','seconds','us each')
+    for name, strat in sorted(report['strategies'].items(),key = lambda item: -item[1]['seconds']):
+        print '%-22s %10d %10.3f %10.2f' % (name,strat['calls'],strat['seconds'],strat['us_per_call'])
@@ -0,0 +1,102 @@
+import numpy
+
+import prisoners_dilemma as pd
+from history import DEPTH
+from vectorized import kernels
+
+## what the engines need to know about each strategy besides the function itself: how far back it looks,
+## whether it flips coins, which module globals in prisoners_dilemma it reads, and whether it looks beyond
+## its own pair's games. the fast paths (vectorized kernels, exact tables, cached and fast-forwarded
+## matches) decide from this what they can do with a strategy, and runs can pick strategies by name
+
+
+class Strategy(object):
+    def __init__(self,func,depth,stochastic,params = (),needs_everyone = False):
+        '''func = the strategy function, called as func(player1, player2)
+        depth = how many of the opponent's past moves against it the strategy reads
+        stochastic = whether it uses random numbers
+        params = names of the globals in prisoners_dilemma it reads, like 'percentagedefect'
+        needs_everyone = reads the opponent's games against other players too'''
+        self.func = func
+        self.name = func.__name__
+        self.depth = depth
+        self.stochastic = stochastic
+        self.params = tuple(params)
+        self.needs_everyone = needs_everyone
+        ## the array version from vectorized.py, if there is one
+        self.kernel = kernels.get(func)
+
+    def values(self):
+        '''current values of the strategy's parameters'''
+        return dict((name,getattr(pd,name)) for name in self.params)
+
+    def table(self):
+        '''table[count, opp's last moves] = probability of defecting, see defect_table'''
+        return defect_table(self)
+
+    def __repr__(self):
+        return '<Strategy %s>' % self.name
+
+
+registry = {}
+
+def register(func,depth,stochastic,params = (),needs_everyone = False):
+    strategy = Strategy(func,depth,stochastic,params,needs_everyone)
+    registry[strategy.name] = strategy
+    return strategy
+
+register(pd.mostlyrandomplay,3,True)
+register(pd.always_cooperate,0,False)
+register(pd.clever,2,False)
+register(pd.always_defect,0,False)
+register(pd.mostly_defect,0,True,['percentagedefect'])
+register(pd.tit_for_tat_1,1,False,needs_everyone = True)
+register(pd.tit_for_tat_2,1,False)
+register(pd.tit_for_tat_opp,2,True)
+register(pd.mostly_cooperate,3,True,['percentagecooperate'])
+register(pd.mostly_tit_for_tat,1,True,['percentage_tit_for_tat'])
+register(pd.tit_for_two_tat,2,False)
+register(pd.tit_for_tat_forgiving,1,True,['tit_for_tat_param'])
+
+
+def lookup(strat):
+    '''the registry entry for a strategy, given as a function, a name or an entry'''
+    if isinstance(strat,Strategy):
+        return strat
+    if callable(strat):
+        strat = strat.__name__
+    if strat not in registry:
+        raise KeyError('no strategy called %s, the choices are %s' % (strat,', '.join(sorted(registry))))
+    return registry[strat]
+
+def by_name(names):
+    '''strategy functions for a list of names, for picking a run's strategies'''
+    return [lookup(name).func for name in names]
+
+def deterministic():
+    '''functions of the strategies whose next move is fixed by their own pair's history'''
+    return set(s.func for s in registry.values() if not s.stochastic and not s.needs_everyone)
+
+def needs_everyone():
+    return set(s.func for s in registry.values() if s.needs_everyone)
+
+def max_depth(strats):
+    return max([lookup(strat).depth for strat in strats] + [0])
+
+
+def defect_table(strat):
+    '''table[count, opp's last moves] = probability strat defects, worked out exactly from its kernel.
+    the kernels are step functions of their random number, changing only at 0.5 (coin flips) or at one of
+    the strategy's parameters, so evaluating them in the middle of every gap between those and weighting
+    by the gap's width gives the exact probability'''
+    strat = lookup(strat)
+    if strat.kernel is None:
+        raise ValueError('%s has no kernel to build a table from' % strat.name)
+    edges = numpy.unique(numpy.clip([0.0,0.5,1.0] + list(strat.values().values()),0.0,1.0))
+    mids = (edges[:-1] + edges[1:]) / 2
+    widths = numpy.diff(edges)
+    count, last = numpy.meshgrid(numpy.arange(DEPTH + 1),numpy.arange(1 << DEPTH),indexing='ij')
+    table = numpy.zeros(count.shape)
+    for mid, width in zip(mids,widths):
+        table += width * strat.kernel(last,count,numpy.zeros(count.shape) + mid)
+    return table
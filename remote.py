@@ -0,0 +1,207 @@
+import json
+import select
+import socket
+import SocketServer
+import time
+
+import prisoners_dilemma as pd
+from history import COOPERATE, DEFECT
+
+## strategies that live in other processes, e.g. entrants written by other teams. a RemoteStrategy goes
+## in playerlist like any strategy function, but its moves come from a bot server over a local socket.
+## within a round every pair plays once, so every move of a round only depends on the rounds before it,
+## and Gateway.play_rounds asks each remote strategy for all its moves of a round in one request before
+## the games are played. the requests to different strategies go out together and are waited on together,
+## so a round costs one round trip whatever the number of games. a bot that doesn't answer in time gets
+## its default move for the round.
+## the protocol is a line of json each way. request: {"games": [[opp_bits, opp_count, my_bits, my_count],
+## ...]}, bits being the last moves against the other player with the most recent in bit 0 and 1 = defect,
+## as in history.py. answer: {"moves": [0 or 1 for each game]}. serve() runs a bot server for a function
+## taking those four numbers and returning COOPERATE or DEFECT
+##   bot = RemoteStrategy('their_bot',('127.0.0.1',9000))
+##   pd.strat_list.append(bot)
+##   gateway = Gateway()
+##   pd.evolve2(100,10,toPrint = False,playrounds = gateway.play_rounds)
+
+MOVES = {COOPERATE: 'cooperate',DEFECT: 'defect'}
+
+
+def _connect(address,timeout):
+    family = socket.AF_UNIX if isinstance(address,str) else socket.AF_INET
+    sock = socket.socket(family,socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    sock.connect(address)
+    if family == socket.AF_INET:
+        sock.setsockopt(socket.IPPROTO_TCP,socket.TCP_NODELAY,1)
+    sock.setblocking(0)
+    return sock
+
+
+class RemoteStrategy(object):
+    def __init__(self,name,address,timeout = 1.0,default = COOPERATE,poolsize = 2):
+        '''name = what it's called in output, like a strategy function's __name__
+        address = (host, port), or the path of a unix socket
+        timeout = seconds to wait for an answer before playing default instead
+        poolsize = most idle connections kept open'''
+        self.__name__ = name
+        self.address = address
+        self.timeout = timeout
+        self.default = default
+        self.poolsize = poolsize
+        self.idle = []
+        ## (my slot, opp's slot) -> move, filled in by Gateway before a round
+        self.moves = {}
+        self.requests = 0
+        self.timeouts = 0
+
+    def __repr__(self):
+        return '<RemoteStrategy %s at %s>' % (self.__name__,self.address)
+
+    def __call__(self,player1,player2):
+        move = self.moves.pop((player1.index,player2.index),None)
+        if move is None:
+            ## not asked for in advance, e.g. play() called directly: ask for this one game
+            move = ask([(self,[_view(player1.index,player2.index)])])[0][0]
+        return MOVES[move]
+
+    def acquire(self):
+        if self.idle:
+            return self.idle.pop()
+        return _connect(self.address,self.timeout)
+
+    def release(self,sock):
+        if len(self.idle) < self.poolsize:
+            self.idle.append(sock)
+        else:
+            sock.close()
+
+    def close(self):
+        for sock in self.idle:
+            sock.close()
+        self.idle = []
+
+
+def _view(i,j):
+    '''what slot i's strategy gets to see for its game against j'''
+    history = pd.playhistory
+    my_bits, my_count = history.state(i,j)
+    opp_bits, opp_count = history.state(j,i)
+    return [opp_bits,opp_count,my_bits,my_count]
+
+def ask(batches):
+    '''batches = [(remote strategy, list of game views)]. sends every batch at once and waits for the
+    answers, at most each strategy's timeout. returns the moves for each batch, in order; a batch that
+    fails or runs out of time gets its strategy's default moves'''
+    answers = [None] * len(batches)
+    ## socket -> (batch number, answer so far)
+    waiting = {}
+    deadline = {}
+    for k, (strat, games) in enumerate(batches):
+        strat.requests += 1
+        try:
+            sock = strat.acquire()
+            sock.settimeout(strat.timeout)
+            sock.sendall(json.dumps({'games': games}) + '\n')
+            sock.setblocking(0)
+        except (socket.error,socket.timeout):
+            strat.timeouts += 1
+            answers[k] = [strat.default] * len(games)
+            continue
+        waiting[sock] = (k,'')
+        deadline[sock] = time.time() + strat.timeout
+    while waiting:
+        left = min(deadline[sock] for sock in waiting) - time.time()
+        ready = select.select(list(waiting),[],[],max(0,left))[0] if left > 0 else []
+        for sock in ready:
+            k, text = waiting[sock]
+            try:
+                chunk = sock.recv(65536)
+            except socket.error:
+                chunk = ''
+            if not chunk:
+                ## the bot hung up
+                del waiting[sock]
+                sock.close()
+                continue
+            text += chunk
+            if text.endswith('\n'):
+                del waiting[sock]
+                try:
+                    moves = json.loads(text)['moves']
+                except (ValueError,KeyError,TypeError):
+                    moves = None
+                if not isinstance(moves,list) or len(moves) != len(batches[k][1]):
+                    ## garbled: treat it like no answer
+                    sock.close()
+                    continue
+                answers[k] = [DEFECT if move else COOPERATE for move in moves]
+                batches[k][0].release(sock)
+            else:
+                waiting[sock] = (k,text)
+        now = time.time()
+        for sock in [sock for sock in waiting if deadline[sock] <= now]:
+            ## a late answer would get mixed up with the next one, so the connection goes
+            del waiting[sock]
+            sock.close()
+    for k, (strat, games) in enumerate(batches):
+        if answers[k] is None:
+            strat.timeouts += 1
+            answers[k] = [strat.default] * len(games)
+    return answers
+
+
+class Gateway(object):
+    def __init__(self,players = pd.playerlist):
+        self.players = players
+
+    def prefetch(self,matches):
+        '''ask every remote strategy for its moves in the games matches (pairs of positions in players)'''
+        wanted = {}
+        for a, b in matches:
+            player1, player2 = self.players[a], self.players[b]
+            for me, opp in ((player1,player2),(player2,player1)):
+                if isinstance(me.strat,RemoteStrategy):
+                    wanted.setdefault(me.strat,[]).append((me.index,opp.index))
+        batches = [(strat,[_view(i,j) for i, j in games]) for strat, games in wanted.items()]
+        for (strat, views), moves in zip(batches,ask(batches)):
+            strat.moves = dict(zip(wanted[strat],moves))
+
+    def play_round(self):
+        '''play_oneround_randomorder with the remote moves fetched first'''
+        matches = pd.all_matches()
+        self.prefetch(matches)
+        for a, b in matches:
+            pd.play(self.players[a],self.players[b])
+
+    def play_rounds(self,numrounds):
+        '''drop in for play_multiple_rounds'''
+        for t in range(numrounds):
+            self.play_round()
+
+
+class _BotHandler(SocketServer.StreamRequestHandler):
+    def handle(self):
+        ## one connection carries request after request
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+            games = json.loads(line)['games']
+            moves = [int(self.server.decide(*game)) for game in games]
+            self.wfile.write(json.dumps({'moves': moves}) + '\n')
+            self.wfile.flush()
+
+class _BotServer(SocketServer.ThreadingMixIn,SocketServer.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+def serve(decide,address = ('127.0.0.1',9000)):
+    '''run a bot server: decide(opp_bits, opp_count, my_bits, my_count) returns COOPERATE or DEFECT.
+    returns the server, call serve_forever() on it (or run it in a thread)'''
+    if isinstance(address,str):
+        server = SocketServer.ThreadingUnixStreamServer(address,_BotHandler)
+        server.daemon_threads = True
+    else:
+        server = _BotServer(address,_BotHandler)
+    server.decide = decide
+    return server
@@ -5,16 +5,6 @@ numteams = 9
 
 
 
-for i in range(numteams):
-    Team(i,random.choice(strat_list))
-print len(teamlist)
-
-teamorder = range(numteams)
-print teamorder
-
-for i in range(numteams):
-    teamorder[i] = teamlist[teamorder[i]]
-    
 
 def all_matches():
     list_tups = []
@@ -42,6 +32,8 @@ def play_multiple_rounds(numrounds):
     
     
 def play_each_other(numtimes):
+    ## built here rather than next to the game below, so it works when the module is imported
+    teamorder = list(teamlist)
     for t in range(numtimes):
         random.shuffle(teamorder)
        
@@ -51,9 +43,15 @@ def play_each_other(numtimes):
                 play(teamorder[i],teamorder[j])
             
     
-play_multiple_rounds(2)
-for i in range(len(teamlist)):
-    print str(teamlist[i].__str__()) + '\'s'+'points=' + str(teamlist[i].points) + '   ',str(teamlist[i].strat)
+## only play when run as a script, importing shouldn't start a game
+if __name__ == '__main__':
+    for i in range(numteams):
+        Team(i,random.choice(strat_list))
+    print len(teamlist)
+
+    play_multiple_rounds(2)
+    for i in range(len(teamlist)):
+        print str(teamlist[i].__str__()) + '\'s'+'points=' + str(teamlist[i].points) + '   ',str(teamlist[i].strat)
     
 
 
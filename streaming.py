@@ -0,0 +1,105 @@
+import json
+import threading
+from Queue import Full, Queue
+
+## watching a long run while it goes. evolve1 and evolve2 (and population.evolve) take record = a
+## function that gets a small dict for each generation (see pd.generation_record), and every = how often.
+## JsonlSink is such a function, appending one line per record to a file, which can be read back with
+## read_jsonl while the run is still writing to it. nothing is kept in memory but the current batch
+##   with JsonlSink('run.jsonl') as sink:
+##       pd.evolve2(100000,10,toPrint = False,record = sink,every = 100)
+
+
+class JsonlSink(object):
+    def __init__(self,path,batch = 100):
+        '''path = file to append to, batch = records to collect before writing them out'''
+        self.path = path
+        self.batch = batch
+        self.pending = []
+        self.written = 0
+        self.file = open(path,'a')
+
+    def __call__(self,record):
+        self.pending.append(json.dumps(record,sort_keys = True))
+        if len(self.pending) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.file.write('\n'.join(self.pending) + '\n')
+            self.written += len(self.pending)
+            self.pending = []
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc):
+        self.close()
+
+
+def read_jsonl(path):
+    '''the records in path, one at a time. a last line that's only half written yet is left out'''
+    with open(path) as f:
+        for line in f:
+            if not line.endswith('\n'):
+                break
+            yield json.loads(line)
+
+
+_done = object()
+
+class _Stopped(Exception):
+    '''raised in the run's thread once nobody is reading its records any more'''
+
+def generations(evolve,*args,**kwargs):
+    '''the records of evolve(*args, record=..., **kwargs) as a generator, e.g.
+    for record in generations(pd.evolve2,1000,10,toPrint = False): ...
+    evolve runs in a thread that waits for each record to be taken before it goes on, so the run only
+    goes as fast as it's read. leaving the loop early (or closing the generator) stops the run at its
+    next record'''
+    records = Queue(1)
+    failed = []
+    stop = threading.Event()
+
+    def put(record):
+        ## wait for the reader, checking now and then whether it has gone
+        while not stop.is_set():
+            try:
+                records.put(record,timeout = 0.1)
+                return
+            except Full:
+                pass
+        raise _Stopped()
+
+    def target():
+        try:
+            evolve(*args,record = put,**kwargs)
+        except _Stopped:
+            return
+        except Exception as e:
+            failed.append(e)
+        try:
+            put(_done)
+        except _Stopped:
+            pass
+
+    thread = threading.Thread(target = target)
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            record = records.get()
+            if record is _done:
+                break
+            yield record
+    finally:
+        stop.set()
+    thread.join()
+    if failed:
+        raise failed[0]
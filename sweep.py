@@ -0,0 +1,161 @@
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+
+import numpy
+
+import prisoners_dilemma as pd
+from registry import lookup
+
+## evolve2 over a grid (or a random sample) of parameter settings, spread over a process pool like
+## ensemble.py. every finished point is saved in its own small file under the cache directory, named after
+## a hash of everything that went into it, so running a bigger grid later only runs the new points
+##   points = grid(d = [5,7,9],mutation_parameter = [0.01,0.02,0.05])
+##   results = run_sweep(points,numgens = 200,numyears_pergen = 10,seeds = 4)
+
+## what a point can set, and the values it gets when it doesn't say
+DEFAULTS = {'d': pd.d,'c': pd.c,'n': pd.n,'mutation_parameter': pd.mutation_parameter,
+            'cruel_selection': pd.cruel_selection,'tit_for_tat_param': pd.tit_for_tat_param,
+            'percentagedefect': pd.percentagedefect,'percentagecooperate': pd.percentagecooperate,
+            'percentage_tit_for_tat': pd.percentage_tit_for_tat,'initial_strat': pd.initial_strat.__name__,
+            'numplayers': pd.numplayers}
+
+
+def grid(**axes):
+    '''every combination of the values given for each parameter, as a list of dicts'''
+    names = sorted(axes)
+    return [dict(zip(names,values)) for values in itertools.product(*[axes[name] for name in names])]
+
+def random_design(num,seed = 0,**ranges):
+    '''num points drawn at random: a (low, high) tuple is a uniform range, a list is a set of choices.
+    integer ranges give integers'''
+    rng = random.Random(seed)
+    points = []
+    for k in range(num):
+        point = {}
+        for name in sorted(ranges):
+            spec = ranges[name]
+            if isinstance(spec,list):
+                point[name] = rng.choice(spec)
+            elif isinstance(spec[0],int) and isinstance(spec[1],int):
+                point[name] = rng.randint(spec[0],spec[1])
+            else:
+                point[name] = rng.uniform(spec[0],spec[1])
+        points.append(point)
+    return points
+
+
+def configure(point):
+    '''set prisoners_dilemma's globals for point, anything it leaves out going back to its default'''
+    for name in point:
+        if name not in DEFAULTS:
+            raise KeyError('%s is not a parameter the sweep can set, the choices are %s' % (name,', '.join(sorted(DEFAULTS))))
+    config = dict(DEFAULTS)
+    config.update(point)
+    for name, value in config.items():
+        if name != 'initial_strat':
+            setattr(pd,name,value)
+    return config
+
+def run_point(args):
+    '''one evolve2 run. args = (point, seed, numgens, numyears_pergen)
+    returns a dict of strategy name -> number of survivors'''
+    point, seed, numgens, numyears_pergen = args
+    config = configure(point)
+    random.seed(seed)
+    numpy.random.seed(seed)
+    pd.new_population(lookup(config['initial_strat']).func,config['numplayers'])
+    pd.evolve2(numgens,numyears_pergen,toPrint = False)
+    survivors = {}
+    for player in pd.playerlist:
+        survivors[player.strat.__name__] = survivors.get(player.strat.__name__,0) + 1
+    return survivors
+
+
+def key(point,seed,numgens,numyears_pergen):
+    '''name of the cache file for a run: a hash of its full configuration, defaults filled in'''
+    config = dict(DEFAULTS)
+    config.update(point)
+    text = json.dumps({'config': config,'seed': seed,'numgens': numgens,'numyears_pergen': numyears_pergen},sort_keys = True)
+    return hashlib.sha1(text).hexdigest()
+
+def _cached(cache_dir,name):
+    path = os.path.join(cache_dir,name + '.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def _store(cache_dir,name,result):
+    ## written under another name and renamed, so a half written file never looks like a finished point
+    fd, tmp = tempfile.mkstemp(dir = cache_dir)
+    with os.fdopen(fd,'w') as f:
+        json.dump(result,f,sort_keys = True)
+    os.rename(tmp,os.path.join(cache_dir,name + '.json'))
+
+def _run_task(task):
+    name, args = task
+    return name, run_point(args)
+
+
+def run_sweep(points,numgens,numyears_pergen,seeds = 1,seed = 0,cache_dir = 'sweep_cache',processes = None):
+    '''runs every point seeds times, run k seeded with seed + k, only running what isn't in cache_dir yet.
+    returns one dict per point and seed, in order: {'point', 'seed', 'survivors'}'''
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    runs = [(point,seed + k) for point in points for k in range(seeds)]
+    names = [key(point,s,numgens,numyears_pergen) for point, s in runs]
+    results = dict((name,_cached(cache_dir,name)) for name in names)
+    ## the same run can turn up twice in a list, it only needs doing once
+    tasks = dict((name,(point,s,numgens,numyears_pergen)) for name, (point, s) in zip(names,runs) if results[name] is None)
+    if tasks:
+        processes = processes or multiprocessing.cpu_count()
+        pool = multiprocessing.Pool(processes)
+        chunksize = max(1,len(tasks) // (4 * processes))
+        try:
+            for name, survivors in pool.imap_unordered(_run_task,tasks.items(),chunksize):
+                point, s = tasks[name][:2]
+                results[name] = {'point': point,'seed': s,'numgens': numgens,'numyears_pergen': numyears_pergen,
+                                 'survivors': survivors}
+                _store(cache_dir,name,results[name])
+        finally:
+            pool.close()
+            pool.join()
+    return [results[name] for name in names]
+
+
+def _value(text):
+    for kind in (int,float):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    return text
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'evolve2 over a grid of parameters')
+    parser.add_argument('axes',nargs = '+',metavar = 'name=v1,v2,...',
+                        help = 'values for a parameter, one of %s' % ', '.join(sorted(DEFAULTS)))
+    parser.add_argument('--generations',type = int,default = 200)
+    parser.add_argument('--years',type = int,default = 10)
+    parser.add_argument('--seeds',type = int,default = 1,help = 'runs per point')
+    parser.add_argument('--seed',type = int,default = 0)
+    parser.add_argument('--cache',default = 'sweep_cache',help = 'directory finished runs are kept in')
+    parser.add_argument('--processes',type = int)
+    args = parser.parse_args(argv)
+    axes = {}
+    for axis in args.axes:
+        name, values = axis.split('=',1)
+        axes[name] = [_value(value) for value in values.split(',')]
+    for result in run_sweep(grid(**axes),args.generations,args.years,args.seeds,args.seed,args.cache,args.processes):
+        point = ' '.join('%s=%s' % item for item in sorted(result['point'].items()))
+        survivors = ' '.join('%s:%d' % item for item in sorted(result['survivors'].items(),key = lambda item: -item[1]))
+        print '%s seed=%d  %s' % (point,result['seed'],survivors)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+import random
+
+import numpy
+
+import prisoners_dilemma as pd
+from history import DEPTH
+from population import Population
+from registry import lookup
+from vectorized import payoff_table
+
+## strategies that are just a table: the chance of defecting for every state of the last k games between
+## two players (both sides' moves), k up to DEPTH since that's all the history keeps. instead of picking
+## from the few functions in strat_list, mutation changes entries of a player's table, so evolution can
+## wander through as many strategies as there are tables. a whole population's tables are one 2d array,
+## and a round is one lookup into it for every pair at once
+##   pop = TablePopulation.random(100,k = 2)
+##   evolve(pop,1000,10)
+
+def table_size(k):
+    '''entries in a memory-k table: counts 0 to k of games played, times 2**k of my moves, times 2**k of
+    the opponent's'''
+    return (k + 1) << (2 * k)
+
+def state_index(k,count,mine,theirs):
+    '''where in a memory-k table a state is. count = games the pair has played, mine and theirs = last
+    moves as in PairHistory.bits. works on arrays'''
+    mask = (1 << k) - 1
+    return (numpy.minimum(count,k) << (2 * k)) | ((mine & mask) << k) | (theirs & mask)
+
+def random_table(k,rng = numpy.random,stochastic = False):
+    '''a table of coin flips: 0/1 entries, or any probability if stochastic'''
+    if stochastic:
+        return rng.random_sample(table_size(k))
+    return (rng.random_sample(table_size(k)) < 0.5).astype(float)
+
+def from_strategy(strat,k = DEPTH):
+    '''the table that plays like one of the strategies in the registry (as long as it doesn't look back
+    more than k games)'''
+    strat = lookup(strat)
+    if strat.depth > k:
+        raise ValueError('%s looks back %d games, more than %d' % (strat.name,strat.depth,k))
+    defect = strat.table()
+    count, mine, theirs = numpy.meshgrid(numpy.arange(k + 1),numpy.arange(1 << k),numpy.arange(1 << k),indexing='ij')
+    ## the registry's table stops counting at DEPTH, and the strategy can't tell k games from more
+    table = numpy.zeros(table_size(k))
+    table[state_index(k,count,mine,theirs)] = defect[numpy.where(count == k,DEPTH,count),theirs]
+    return table
+
+
+class TableStrategy(object):
+    def __init__(self,table,k = DEPTH,name = None):
+        '''a table as a strategy function for Player and play(), name is what it's called in output'''
+        self.table = numpy.asarray(table,dtype=float)
+        self.k = k
+        self.__name__ = name or 'table_%08x' % (hash(self.table.tostring()) & 0xffffffff)
+
+    def __call__(self,player1,player2):
+        mine, count = pd.playhistory.state(player1.index,player2.index)
+        theirs = pd.playhistory.state(player2.index,player1.index)[0]
+        if random.random() < self.table[state_index(self.k,count,mine,theirs)]:
+            return 'defect'
+        return 'cooperate'
+
+
+def decide(tables,k,bits,count,rand):
+    '''moves[i, j] = True where player i defects against player j, tables[i] being player i's table and
+    bits, count the pair history of the players (as PairHistory.bits and count)'''
+    index = state_index(k,count,bits,bits.T)
+    return rand < tables[numpy.arange(len(tables))[:,None],index]
+
+def play_tables(tables,k,history,slots,numrounds,rng = numpy.random):
+    '''like vectorized.play_block, for players with tables. returns each player's points'''
+    block = numpy.ix_(slots,slots)
+    bits = history.bits[block]
+    count = history.count[block]
+    num = len(slots)
+    points = numpy.zeros(num)
+    payoff = payoff_table()
+    for t in range(numrounds):
+        moves = decide(tables,k,bits,count,rng.random_sample((num,num)))
+        ## nobody plays themselves
+        numpy.fill_diagonal(moves,False)
+        mine = moves.astype(numpy.intp)
+        won = payoff[mine,mine.T]
+        numpy.fill_diagonal(won,0)
+        points += won.sum(axis=1)
+        bits = ((bits << 1) | moves) & history.mask
+        count = numpy.minimum(count + 1,history.depth)
+        numpy.fill_diagonal(bits,0)
+        numpy.fill_diagonal(count,0)
+    history.bits[block] = bits
+    history.count[block] = count
+    return points
+
+
+class TablePopulation(Population):
+    '''a Population whose players each have their own table instead of a strategy id'''
+    def __init__(self,capacity,k = DEPTH,history = None):
+        if k > DEPTH:
+            raise ValueError('the history only keeps %d moves, not %d' % (DEPTH,k))
+        Population.__init__(self,capacity,[],history)
+        self.k = k
+        self.tables = numpy.zeros((capacity,table_size(k)))
+
+    def _grow(self):
+        old = len(self.alive)
+        Population._grow(self)
+        self.tables = numpy.concatenate([self.tables,numpy.zeros((len(self.alive) - old,self.tables.shape[1]))])
+
+    def add(self,table):
+        '''a new player with a copy of table. returns its slot'''
+        slot = Population.add(self,0)
+        self.tables[slot] = table
+        return slot
+
+    def counts(self):
+        '''number of different tables and how many players have the commonest'''
+        tables = self.tables[self.slots()]
+        distinct, counts = numpy.unique(tables,axis=0,return_counts=True)
+        return len(distinct), int(counts.max())
+
+    def play_rounds(self,numrounds,rng = numpy.random):
+        slots = self.slots()
+        self.points[slots] += play_tables(self.tables[slots],self.k,self.history,slots,numrounds,rng)
+
+    @classmethod
+    def random(cls,num,k = DEPTH,rng = numpy.random,stochastic = False):
+        pop = cls(num,k)
+        for i in range(num):
+            pop.add(random_table(k,rng,stochastic))
+        return pop
+
+
+def mutate(pop,slots,rng = numpy.random,sigma = 0.1):
+    '''each of slots gets one entry of its table changed: a 0/1 entry flips, anything in between moves by
+    a normal step of size sigma'''
+    entries = rng.randint(pop.tables.shape[1],size=len(slots))
+    old = pop.tables[slots,entries]
+    binary = (old == 0) | (old == 1)
+    pop.tables[slots,entries] = numpy.where(binary,1 - old,numpy.clip(old + sigma * rng.standard_normal(len(slots)),0,1))
+
+def generation_record(pop,gen,mutations,deaths):
+    slots = pop.slots()
+    points = pop.points[slots]
+    distinct, commonest = pop.counts()
+    return {'gen': gen,'distinct': distinct,'commonest': commonest,
+            'defect': float(pop.tables[slots].mean()),'mean': float(points.mean()),'min': float(points.min()),
+            'max': float(points.max()),'mutations': mutations,'deaths': deaths}
+
+def evolve(pop,numgens,numyears_pergen,rng = numpy.random,record = None,every = 1,sigma = 0.1):
+    '''population.evolve for tables: each generation every player's table mutates with probability
+    mutation_parameter (see mutate), everybody plays, and the cruel_selection lowest scorers are replaced
+    by copies of the top scorers' tables. record gets generation_record's summaries, every = how often'''
+    profiler = pd.profiler
+    for i in range(numgens):
+        with profiler.phase('mutation'):
+            slots = pop.slots()
+            mutants = slots[rng.random_sample(len(slots)) < pd.mutation_parameter]
+            mutate(pop,mutants,rng,sigma)
+        with profiler.phase('play'):
+            pop.play_rounds(numyears_pergen,rng)
+        if record is not None and i % every == 0:
+            record(generation_record(pop,i,len(mutants),pd.cruel_selection))
+        with profiler.phase('selection'):
+            losers = pop.lowest(pd.cruel_selection)
+            ## copied, since a newborn may get a slot whose row is still to be read
+            winners = pop.tables[pop.highest(pd.cruel_selection)].copy()
+            for slot in losers:
+                pop.remove(slot)
+        with profiler.phase('reproduction'):
+            for table in winners:
+                pop.add(table)
+        with profiler.phase('reset'):
+            pop.endgen()
+        profiler.endgen()
+    pop.play_rounds(numyears_pergen,rng)
+    if record is not None:
+        record(generation_record(pop,numgens,0,pd.cruel_selection))
+    for slot in pop.lowest(pd.cruel_selection):
+        pop.remove(slot)
+    return pop
@@ -0,0 +1,179 @@
+import numpy
+
+import prisoners_dilemma as pd
+from history import DEPTH, DEFECT
+from vectorized import kernels, payoff_table
+
+## instead of everybody playing everybody, players only play their neighbours on a graph, or a few random
+## opponents that change every generation. the graph is an array of edges, edges[e] = (i, j) with
+## i < j, and history is only kept for the edges, so a round costs O(number of edges) = O(N*k).
+## slots are Population slots (population.py): a player born into a slot takes over its place on the graph
+
+
+def ring(num,radius = 1):
+    '''num players in a circle, each joined to the radius nearest players on either side'''
+    if num <= 2 * radius:
+        raise ValueError('a ring of %d players is too small for radius %d' % (num,radius))
+    slots = numpy.arange(num)
+    edges = [numpy.stack([slots,(slots + d) % num],axis=1) for d in range(1,radius + 1)]
+    return _canonical(numpy.concatenate(edges))
+
+def lattice(width,height):
+    '''width*height players on a grid that wraps around at the edges, each joined to the four next to it'''
+    if width < 3 or height < 3:
+        raise ValueError('a lattice needs to be at least 3x3, not %dx%d' % (width,height))
+    slots = numpy.arange(width * height).reshape(height,width)
+    right = numpy.stack([slots.ravel(),numpy.roll(slots,-1,axis=1).ravel()],axis=1)
+    down = numpy.stack([slots.ravel(),numpy.roll(slots,-1,axis=0).ravel()],axis=1)
+    return _canonical(numpy.concatenate([right,down]))
+
+def random_regular(num,k,rng = numpy.random,tries = 100):
+    '''a random graph where every player has exactly k neighbours. stubs are paired up at random,
+    pairs that would make a loop or a repeated edge are thrown back and paired again'''
+    if (num * k) % 2 or k >= num:
+        raise ValueError('no %d-regular graph on %d players' % (k,num))
+    for attempt in range(tries):
+        stubs = numpy.repeat(numpy.arange(num),k)
+        edges = set()
+        while len(stubs):
+            rng.shuffle(stubs)
+            left = []
+            for i, j in zip(stubs[0::2],stubs[1::2]):
+                edge = (min(i,j),max(i,j))
+                if i == j or edge in edges:
+                    left.extend([i,j])
+                else:
+                    edges.add(edge)
+            if len(left) == len(stubs):
+                ## every remaining pairing is bad, start over
+                break
+            stubs = numpy.array(left,dtype=numpy.intp)
+        else:
+            return _canonical(numpy.array(sorted(edges),dtype=numpy.intp).reshape(-1,2))
+    raise ValueError('couldn\'t make a %d-regular graph on %d players in %d tries' % (k,num,tries))
+
+def random_opponents(slots,k,rng = numpy.random):
+    '''every player in slots picks k random opponents from the others. repeats are dropped, so a player
+    plays at least k games (its own picks) plus whoever picked it'''
+    slots = numpy.asarray(slots)
+    num = len(slots)
+    if num < 2:
+        return numpy.zeros((0,2),dtype=numpy.intp)
+    me = numpy.repeat(numpy.arange(num),k)
+    ## any offset but 0 lands on somebody else
+    them = (me + 1 + rng.randint(num - 1,size=len(me))) % num
+    return _canonical(numpy.stack([slots[me],slots[them]],axis=1))
+
+def _canonical(edges):
+    '''edges with i < j in every row, no repeats, sorted'''
+    edges = numpy.sort(numpy.asarray(edges,dtype=numpy.intp),axis=1)
+    if len(edges) == 0:
+        return edges.reshape(0,2)
+    ## one number per edge is much quicker to unique than rows
+    size = edges.max() + 1
+    keys = numpy.unique(edges[:,0] * size + edges[:,1])
+    return numpy.stack([keys // size,keys % size],axis=1)
+
+
+class EdgeHistory(object):
+    def __init__(self,edges,depth = DEPTH):
+        '''history for the pairs in edges only, laid out like PairHistory.
+        bits[e, 0] = edges[e,0]'s last moves against edges[e,1], bits[e, 1] the other way round'''
+        self.edges = numpy.asarray(edges,dtype=numpy.intp).reshape(-1,2)
+        self.depth = depth
+        self.mask = (1 << depth) - 1
+        self.bits = numpy.zeros((len(self.edges),2),dtype=numpy.uint8)
+        self.count = numpy.zeros(len(self.edges),dtype=numpy.uint8)
+        ## incident[start[s]:start[s+1]] = the edges slot s is on
+        ends = self.edges.ravel()
+        self.incident = numpy.argsort(ends,kind='mergesort') // 2
+        size = ends.max() + 1 if len(ends) else 0
+        self.start = numpy.concatenate([[0],numpy.cumsum(numpy.bincount(ends,minlength=size))])
+
+    def grow(self,size):
+        ## slots past the end of the graph simply have no neighbours
+        pass
+
+    def reset(self,slot):
+        if slot + 1 >= len(self.start):
+            return
+        mine = self.incident[self.start[slot]:self.start[slot + 1]]
+        self.bits[mine] = 0
+        self.count[mine] = 0
+
+    def neighbours(self,slot):
+        if slot + 1 >= len(self.start):
+            return numpy.zeros(0,dtype=numpy.intp)
+        mine = self.edges[self.incident[self.start[slot]:self.start[slot + 1]]]
+        return numpy.where(mine[:,0] == slot,mine[:,1],mine[:,0])
+
+
+def _tit_for_tat_1(lastplay,rand):
+    return lastplay == DEFECT
+
+## strategies that look at the opponent's games against everybody (registry.needs_everyone), with the
+## opponent's latest move against anybody instead of the pair's bits
+global_kernels = {pd.tit_for_tat_1: _tit_for_tat_1}
+
+
+def play_rows(history,rows,strats,strat_ids,numrounds,numplayers,rng = numpy.random,draw = None,lastplay = None):
+    '''numrounds games along each of rows (edges of history), strat_ids[s] = which of strats slot s uses.
+    updates history in place and returns (each slot's points, and the deciders and their moves in the
+    last round; the first half of them are edges[:,0] deciding, the second half edges[:,1])
+    draw(t, decider, opponent) = random numbers for round t, rng.random_sample by default
+    lastplay = every slot's latest move against anybody, for global_kernels, kept up to date'''
+    edges = history.edges[rows]
+    bits = history.bits[rows]
+    count = history.count[rows]
+    num = len(edges)
+    decider = numpy.concatenate([edges[:,0],edges[:,1]])
+    opponent = numpy.concatenate([edges[:,1],edges[:,0]])
+    ids = strat_ids[decider]
+    groups = [(strats[s],numpy.flatnonzero(ids == s)) for s in numpy.unique(ids)]
+    payoff = payoff_table()
+    points = numpy.zeros(numplayers)
+    mine = numpy.zeros(2 * num,dtype=numpy.intp)
+    for t in range(numrounds):
+        ## each decider sees what the other end has played against it
+        opp_bits = numpy.concatenate([bits[:,1],bits[:,0]])
+        opp_count = numpy.concatenate([count,count])
+        rand = rng.random_sample(2 * num) if draw is None else draw(t,decider,opponent)
+        moves = numpy.zeros(2 * num,dtype=bool)
+        for strat, group in groups:
+            if lastplay is not None and strat in global_kernels:
+                moves[group] = global_kernels[strat](lastplay[opponent[group]],rand[group])
+            else:
+                moves[group] = kernels[strat](opp_bits[group],opp_count[group],rand[group])
+        mine = moves.astype(numpy.intp)
+        theirs = numpy.concatenate([mine[num:],mine[:num]])
+        points += numpy.bincount(decider,weights=payoff[mine,theirs],minlength=numplayers)
+        bits = ((bits << 1) | moves.reshape(2,num).T) & history.mask
+        count = numpy.minimum(count + 1,history.depth)
+        if lastplay is not None:
+            lastplay[decider] = mine
+    history.bits[rows] = bits
+    history.count[rows] = count
+    return points, decider, mine
+
+def play_edges(pop,history,numrounds,rng = numpy.random):
+    '''pop's players play numrounds rounds, one game per round along every edge between two live players.
+    adds to pop.points and updates history in place'''
+    live = numpy.flatnonzero(pop.alive[history.edges].all(axis=1))
+    if not len(live):
+        return
+    pop.points += play_rows(history,live,pop.strats,pop.strat_ids,numrounds,len(pop.alive),rng)[0]
+
+
+def graph_rounds(pop,numrounds,rng = numpy.random):
+    '''playrounds for population.evolve when pop.history is an EdgeHistory on a fixed graph, e.g.
+    Population.from_strat(strat,num,edges = ring(num))'''
+    play_edges(pop,pop.history,numrounds,rng)
+
+def sampled_rounds(k):
+    '''playrounds for population.evolve where every generation each player plays k fresh random
+    opponents. nobody remembers anything from one generation's opponents to the next, so pop needs no
+    history of its own: Population.from_strat(strat,num,edges = [])'''
+    def playrounds(pop,numrounds,rng = numpy.random):
+        history = EdgeHistory(random_opponents(pop.slots(),k,rng))
+        play_edges(pop,history,numrounds,rng)
+    return playrounds
@@ -0,0 +1,189 @@
+import argparse
+import math
+import multiprocessing
+
+import numpy
+
+import cycles
+import payoffcache
+import prisoners_dilemma as pd
+from history import DEPTH
+from registry import by_name, lookup
+from vectorized import payoff_table
+
+## a round robin among a fixed roster, repeated until the average of every pairing is known well enough.
+## a match is numrounds games between two strategies starting with no history. deterministic pairs always
+## play the same match, so they're worked out once (cycles.play_match). the rest are played in batches of
+## matches side by side in a process pool, and a pair stops getting batches once the confidence interval
+## of its mean points per game is narrower than the precision asked for, so the coin flippers get the
+## repetitions and nobody else does. finished pairs go in a payoffcache.PayoffCache, so a later tournament
+## with the same settings only plays the pairs it hasn't seen
+##   result = run_tournament(pd.strat_list,numrounds = 10,precision = 0.05)
+##   print_ranking(result)
+
+
+def play_matches(strat1,strat2,numrounds,reps,rng = numpy.random):
+    '''reps independent matches between strat1 and strat2, all at once. returns each side's points in
+    each match'''
+    kernel1 = lookup(strat1).kernel
+    kernel2 = lookup(strat2).kernel
+    if kernel1 is None or kernel2 is None:
+        raise ValueError('%s and %s need kernels to play batches of matches' % (strat1.__name__,strat2.__name__))
+    payoff = payoff_table()
+    ## bits1 = strat1's last moves against strat2, and the other way round
+    bits1 = numpy.zeros(reps,dtype=numpy.intp)
+    bits2 = numpy.zeros(reps,dtype=numpy.intp)
+    points1 = numpy.zeros(reps)
+    points2 = numpy.zeros(reps)
+    mask = (1 << DEPTH) - 1
+    for t in range(numrounds):
+        count = numpy.zeros(reps,dtype=numpy.intp) + min(t,DEPTH)
+        move1 = kernel1(bits2,count,rng.random_sample(reps)).astype(numpy.intp)
+        move2 = kernel2(bits1,count,rng.random_sample(reps)).astype(numpy.intp)
+        points1 += payoff[move1,move2]
+        points2 += payoff[move2,move1]
+        bits1 = ((bits1 << 1) | move1) & mask
+        bits2 = ((bits2 << 1) | move2) & mask
+    return points1, points2
+
+def _batch(args):
+    '''one batch for the pool: (a, b, numrounds, reps, seed, batch number) -> a's and b's points'''
+    a, b, strat1, strat2, numrounds, reps, seed, k = args
+    rng = numpy.random.RandomState([seed,a,b,k])
+    return (a,b) + play_matches(strat1,strat2,numrounds,reps,rng)
+
+
+class _Tally(object):
+    '''running count, mean and sum of squared deviations, merged a batch at a time (Chan et al.)'''
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self,values):
+        n = len(values)
+        mean = values.mean()
+        delta = mean - self.mean
+        total = self.n + n
+        self.m2 += ((values - mean) ** 2).sum() + delta * delta * self.n * n / float(total)
+        self.mean += delta * n / float(total)
+        self.n = total
+
+    def halfwidth(self,z):
+        if self.n < 2:
+            return float('inf')
+        return z * math.sqrt(self.m2 / (self.n - 1) / self.n)
+
+
+def _z(confidence):
+    '''two sided normal quantile, by bisection on erf'''
+    low, high = 0.0,10.0
+    for i in range(100):
+        mid = (low + high) / 2
+        if math.erf(mid / math.sqrt(2)) < confidence:
+            low = mid
+        else:
+            high = mid
+    return mid
+
+
+def run_tournament(strats = pd.strat_list,numrounds = 10,precision = 0.05,confidence = 0.95,batch = 64,
+                   minreps = 128,maxreps = 100000,seed = 0,processes = None,cache = payoffcache.cache):
+    '''every pair of strats (and every strategy against itself) plays matches of numrounds games until the
+    confidence interval of each side's mean points per game is within +-precision, or maxreps matches.
+    minreps keeps a rare coin flip that hasn't come up yet from passing for no variance.
+    returns a dict of arrays [s, t] for strats[s] against strats[t]: 'mean' points per game, 'halfwidth'
+    of its interval, 'reps' = matches played, plus 'strats' and 'score' = mean over the roster.
+    cache = where finished pairs are kept between runs, None for nowhere'''
+    strats = list(strats)
+    size = len(strats)
+    z = _z(confidence)
+    mean = numpy.zeros((size,size))
+    halfwidth = numpy.zeros((size,size))
+    reps = numpy.zeros((size,size),dtype=numpy.int64)
+    tallies = {}
+    ## pair -> (entry name, swapped) for the pairs to store at the end, see payoffcache.pair_key
+    names = {}
+    settings = {'precision': precision,'confidence': confidence,'batch': batch,'minreps': minreps,
+                'maxreps': maxreps,'seed': seed}
+    for a in range(size):
+        for b in range(a,size):
+            if cache is not None:
+                name, swapped = payoffcache.pair_key(strats[a],strats[b],numrounds,'tournament',**settings)
+                value = cache.get(name)
+                if value is not None:
+                    order = slice(None,None,-1) if swapped else slice(None)
+                    mean[a,b], mean[b,a] = value['mean'][order]
+                    halfwidth[a,b], halfwidth[b,a] = value['halfwidth'][order]
+                    reps[a,b] = reps[b,a] = value['reps']
+                    continue
+                names[a,b] = name, swapped
+            try:
+                points1, points2, state1, state2 = cycles.play_match(strats[a],strats[b],numrounds)
+            except ValueError:
+                ## somebody flips coins
+                tallies[a,b] = (_Tally(),_Tally())
+                continue
+            mean[a,b], mean[b,a] = points1 / float(numrounds), points2 / float(numrounds)
+            reps[a,b] = reps[b,a] = 1
+    pool = multiprocessing.Pool(processes or multiprocessing.cpu_count()) if tallies else None
+    k = 0
+    try:
+        while tallies:
+            tasks = [(a,b,strats[a],strats[b],numrounds,batch,seed,k) for a, b in sorted(tallies)]
+            for result in pool.imap_unordered(_batch,tasks):
+                a, b, points1, points2 = result
+                tally1, tally2 = tallies[a,b]
+                tally1.add(points1 / float(numrounds))
+                tally2.add(points2 / float(numrounds))
+            for (a, b), (tally1, tally2) in list(tallies.items()):
+                mean[a,b], mean[b,a] = tally1.mean, tally2.mean
+                halfwidth[a,b], halfwidth[b,a] = tally1.halfwidth(z), tally2.halfwidth(z)
+                reps[a,b] = reps[b,a] = tally1.n
+                settled = tally1.n >= minreps and max(halfwidth[a,b],halfwidth[b,a]) <= precision
+                if settled or tally1.n >= maxreps:
+                    del tallies[a,b]
+            k += 1
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    if cache is not None:
+        for (a, b), (name, swapped) in names.items():
+            pair = [(a,b),(b,a)][::-1 if swapped else 1]
+            cache.put(name,{'mean': [float(mean[x]) for x in pair],'halfwidth': [float(halfwidth[x]) for x in pair],
+                            'reps': int(reps[a,b])})
+    return {'strats': strats,'mean': mean,'halfwidth': halfwidth,'reps': reps,'score': mean.mean(axis=1),
+            'confidence': confidence}
+
+
+def print_ranking(result):
+    names = [strat.__name__ for strat in result['strats']]
+    order = numpy.argsort(-result['score'])
+    print '%-22s %8s %9s' % ('strategy','score','matches')
+    for s in order:
+        print '%-22s %8.3f %9d' % (names[s],result['score'][s],result['reps'][s].sum())
+    print
+    print 'points per game against each (columns in the same order), +- at %d%% confidence' % round(100 * result['confidence'])
+    for s in order:
+        print '%-22s %s' % (names[s],' '.join('%5.2f+-%4.2f' % (result['mean'][s,t],result['halfwidth'][s,t]) for t in order))
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'round robin among strategies, repeated until the averages are settled')
+    parser.add_argument('--strategies',nargs = '+',help = 'names, all of strat_list by default')
+    parser.add_argument('--years',type = int,default = 10,help = 'games per match')
+    parser.add_argument('--precision',type = float,default = 0.05,help = 'half width of the intervals, in points per game')
+    parser.add_argument('--confidence',type = float,default = 0.95)
+    parser.add_argument('--seed',type = int,default = 0)
+    parser.add_argument('--processes',type = int)
+    parser.add_argument('--no-cache',action = 'store_true',help = "don't read or keep finished pairs in payoff_cache")
+    args = parser.parse_args(argv)
+    try:
+        strats = by_name(args.strategies) if args.strategies else pd.strat_list
+    except KeyError as e:
+        parser.error(e.args[0])
+    print_ranking(run_tournament(strats,args.years,args.precision,args.confidence,seed = args.seed,
+                                 processes = args.processes,cache = None if args.no_cache else payoffcache.cache))
+
+if __name__ == '__main__':
+    main()
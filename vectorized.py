@@ -0,0 +1,165 @@
+import numpy
+
+import prisoners_dilemma as pd
+from history import PairHistory, COOPERATE, DEFECT
+
+## numpy version of the round-robin in prisoners_dilemma. instead of calling play() for every pair,
+## every player's move against every other player is computed at once and stored as 0/1 in an
+## NxN array: moves[i,j] is what player i does against player j this round. the history of each pair
+## lives in a PairHistory (history.py), the same store the play() loop uses
+
+
+## strategy kernels. each one gets, for a block of (me, opp) pairs:
+##   last  = opp's last DEPTH moves against me as bits, most recent move in bit 0, 1 = defect
+##   count = how many moves opp has made against me so far (stops counting at DEPTH)
+##   rand  = one uniform random number per pair, for the stochastic strategies
+## and returns a boolean array, True where I defect. they mirror the functions in prisoners_dilemma
+
+def streak(last,count,k,move):
+    '''True where the opponent's last k moves against me were all move'''
+    mask = (1 << k) - 1
+    if move == DEFECT:
+        return (count >= k) & (last & mask == mask)
+    return (count >= k) & (last & mask == 0)
+
+def _mostlyrandomplay(last,count,rand):
+    return streak(last,count,3,DEFECT) | (rand < 0.5)
+
+def _always_cooperate(last,count,rand):
+    return numpy.zeros(last.shape,dtype=bool)
+
+def _clever(last,count,rand):
+    return streak(last,count,2,COOPERATE) | streak(last,count,2,DEFECT)
+
+def _always_defect(last,count,rand):
+    return numpy.ones(last.shape,dtype=bool)
+
+def _mostly_defect(last,count,rand):
+    return rand < pd.percentagedefect
+
+def _tit_for_tat_2(last,count,rand):
+    return (count > 0) & (last & 1 == DEFECT)
+
+def _tit_for_tat_opp(last,count,rand):
+    ## first move is a coin flip, then defect on a cooperate or on two defects in a row
+    later = streak(last,count,2,DEFECT) | (last & 1 == COOPERATE)
+    return numpy.where(count == 0,rand < 0.5,later)
+
+def _mostly_cooperate(last,count,rand):
+    return streak(last,count,3,DEFECT) | (rand >= pd.percentagecooperate)
+
+def _mostly_tit_for_tat(last,count,rand):
+    return (rand >= pd.percentage_tit_for_tat) | _tit_for_tat_2(last,count,rand)
+
+def _tit_for_two_tat(last,count,rand):
+    return streak(last,count,2,DEFECT)
+
+def _tit_for_tat_forgiving(last,count,rand):
+    return _tit_for_tat_2(last,count,rand) & (rand >= pd.tit_for_tat_param)
+
+## tit_for_tat_1 isn't here: it looks at the opponent's last move against anyone, which depends on the
+## order the games of a round are played in, so it can only run through play()
+kernels = {pd.mostlyrandomplay: _mostlyrandomplay,
+           pd.always_cooperate: _always_cooperate,
+           pd.clever: _clever,
+           pd.always_defect: _always_defect,
+           pd.mostly_defect: _mostly_defect,
+           pd.tit_for_tat_2: _tit_for_tat_2,
+           pd.tit_for_tat_opp: _tit_for_tat_opp,
+           pd.mostly_cooperate: _mostly_cooperate,
+           pd.mostly_tit_for_tat: _mostly_tit_for_tat,
+           pd.tit_for_two_tat: _tit_for_two_tat,
+           pd.tit_for_tat_forgiving: _tit_for_tat_forgiving}
+
+
+def payoff_table():
+    '''payoff_table()[my move, opp move] = my points for the game, using the current d, c, n'''
+    return numpy.array([[pd.c,0],[pd.d,pd.n]],dtype=float)
+
+
+class VectorizedGame(object):
+    def __init__(self,strats,rng = numpy.random,streams = None,slots = None,gen = 0):
+        '''strats = one strategy function (from strat_list) per player
+        rng = anything with a numpy style random_sample, numpy.random by default
+        streams = a keyed.Streams to draw from instead of rng, keyed by gen, the round and slots[i], the
+        history slot of player i (just i by default)'''
+        self.strats = list(strats)
+        for strat in self.strats:
+            if strat not in kernels:
+                raise ValueError('no vectorized version of strategy %s' % strat.__name__)
+        num = len(self.strats)
+        self.rng = rng
+        self.streams = streams
+        self.slots = numpy.arange(num) if slots is None else numpy.asarray(slots)
+        self.gen = gen
+        ## rounds played so far
+        self.round = 0
+        self.points = numpy.zeros(num)
+        ## slot i of the history is player i of strats
+        self.history = PairHistory(num)
+        self.regroup()
+
+    def regroup(self):
+        '''bucket player indices by strategy, so each kernel runs once per round. call after changing strats'''
+        groups = {}
+        for i, strat in enumerate(self.strats):
+            groups.setdefault(kernels[strat],[]).append(i)
+        self.groups = [(kernel,numpy.array(rows)) for kernel, rows in groups.items()]
+
+    def decide(self):
+        '''moves[i,j] = True where player i defects against player j this round'''
+        num = len(self.strats)
+        if self.streams is None:
+            rand = self.rng.random_sample((num,num))
+        else:
+            rand = self.streams.moves(self.gen,self.round,self.slots[:,None],self.slots[None,:])
+        opp_last = self.history.bits.T
+        opp_count = self.history.count.T
+        moves = numpy.zeros((num,num),dtype=bool)
+        for kernel, rows in self.groups:
+            moves[rows] = kernel(opp_last[rows],opp_count[rows],rand[rows])
+        ## the diagonal isn't a game
+        numpy.fill_diagonal(moves,False)
+        return moves
+
+    def play_round(self):
+        '''every player plays every other player once'''
+        moves = self.decide()
+        mine = moves.astype(numpy.intp)
+        won = payoff_table()[mine,mine.T]
+        numpy.fill_diagonal(won,0)
+        self.points += won.sum(axis=1)
+        self.history.record_all(moves)
+        self.round += 1
+        return moves
+
+    def play_multiple_rounds(self,numrounds):
+        for t in range(numrounds):
+            self.play_round()
+
+def play_block(strats,history,slots,numrounds,rng = numpy.random,onround = None,streams = None,gen = 0):
+    '''the players in history slots slots, using strats, play numrounds full rounds against each other.
+    history is updated in place and each player's points for the rounds are returned
+    onround(t, moves) is called after round t with the moves as VectorizedGame.play_round returns them
+    streams, gen = as in VectorizedGame'''
+    game = VectorizedGame(strats,rng,streams,slots,gen)
+    block = numpy.ix_(slots,slots)
+    game.history.bits[...] = history.bits[block]
+    game.history.count[...] = history.count[block]
+    if onround is None:
+        game.play_multiple_rounds(numrounds)
+    else:
+        for t in range(numrounds):
+            onround(t,game.play_round())
+    history.bits[block] = game.history.bits
+    history.count[block] = game.history.count
+    return game.points
+
+def play_multiple_rounds_vectorized(numrounds,players = pd.playerlist,onround = None):
+    '''drop in for play_multiple_rounds: adds the same points to each player as the play() loop would,
+    and leaves pd.playhistory as it would be afterwards (apart from lastplay, see record_all)
+    onround = as in play_block, row and column k of the moves being players[k]'''
+    points = play_block([player.strat for player in players],pd.playhistory,[player.index for player in players],numrounds,
+                        onround = onround)
+    for i, player in enumerate(players):
+        player.addpoints(points[i])